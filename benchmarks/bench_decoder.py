@@ -0,0 +1,57 @@
+"""Compare the stream page decoder with the former regex and XOR loop.
+
+Run with ``python benchmarks/bench_decoder.py``.
+"""
+from __future__ import print_function, unicode_literals
+
+import base64
+import json
+import os
+import re
+import sys
+import timeit
+from itertools import cycle
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mopidy_mixcloud.decoder import PlayInfoDecoder, find_play_info  # noqa
+
+import fixtures  # noqa
+
+
+def legacy(page):
+    data = page.decode('utf-8')
+    match = re.search(
+        'm-p-ref="cloudcast_page" m-play-info="(.*)" m-preview=', data)
+    playInfo = base64.b64decode(match.group(1))
+    magicString = base64.b64decode(
+        'cGxlYXNlZG9udGRvd25sb2Fkb3VybXVzaWN0aGVhcnRpc3Rzd29udGdldHBhaWQ=')
+    return json.loads(''.join(
+        chr(ord(a) ^ ord(b)) for a, b in zip(playInfo, cycle(magicString))))
+
+
+def chunked(page, size=16384):
+    for i in range(0, len(page), size):
+        yield page[i:i + size]
+
+
+def current(page, decoder=PlayInfoDecoder()):
+    encoded, read = find_play_info(chunked(page))
+    return decoder.decode(encoded), read
+
+
+def main(repeat=5, number=50):
+    page = fixtures.cloudcast_page('/dj-1/mix-session-1/')
+    assert legacy(page) == current(page)[0]
+    results = {}
+    for name, func in (('legacy', legacy), ('decoder', current)):
+        best = min(timeit.repeat(
+            lambda: func(page), repeat=repeat, number=number)) / number
+        results[name] = best
+        print('%-8s %8.3f ms per page' % (name, best * 1000))
+    print('speed-up %.1fx' % (results['legacy'] / results['decoder']))
+    print('bytes read %d of %d' % (current(page)[1], len(page)))
+
+
+if __name__ == '__main__':
+    main()
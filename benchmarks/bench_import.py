@@ -0,0 +1,83 @@
+"""Measure what loading the extension adds to Mopidy startup.
+
+Run with ``python benchmarks/bench_import.py``. Every stage runs in a fresh
+interpreter with Mopidy itself already imported, as it is when Mopidy loads
+its extensions, and reports the median wall time and the expensive modules
+the stage pulled in.
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# what Mopidy has imported before it loads extensions
+PRELUDE = '''
+import sys, time
+sys.path.insert(0, %r)
+import mopidy.backend, mopidy.config, mopidy.ext, mopidy.models, pykka
+before = set(sys.modules)
+start = time.time()
+''' % ROOT
+
+REPORT = '''
+elapsed = time.time() - start
+import json
+print(json.dumps([elapsed, sorted(
+    name for name in set(sys.modules) - before if sys.modules[name])]))
+'''
+
+STAGES = [
+    ('register extension', '''
+import mopidy_mixcloud
+ext = mopidy_mixcloud.MixcloudExtension()
+ext.get_config_schema()
+ext.get_default_config()
+'''),
+    ('import backend', '''
+import mopidy_mixcloud.actor
+'''),
+    ('construct client', '''
+from mopidy_mixcloud.mixcloud import MixcloudClient
+MixcloudClient({'io_engine': 'tornado', 'prefetch_depth': 2})
+'''),
+    ('first request setup', '''
+from mopidy_mixcloud.mixcloud import MixcloudClient
+MixcloudClient({}).http_client
+'''),
+]
+
+HEAVY = ('requests', 'multiprocessing', 'numpy', 'tornado', 'sqlite3')
+
+
+def run(code):
+    output = subprocess.check_output(
+        [sys.executable, '-c', PRELUDE + code + REPORT])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=9)
+    args = parser.parse_args(argv)
+    print('%-22s %9s  %s' % ('stage', 'median ms', 'heavy modules loaded'))
+    for name, code in STAGES:
+        samples = []
+        modules = []
+        for _ in range(args.repeat):
+            elapsed, modules = run(code)
+            samples.append(elapsed)
+        heavy = sorted(set(
+            module.split('.')[0] for module in modules
+            if module.split('.')[0] in HEAVY))
+        print('%-22s %9.1f  %s' % (
+            name, sorted(samples)[len(samples) // 2] * 1000,
+            ', '.join(heavy) or '-'))
+
+
+if __name__ == '__main__':
+    main()
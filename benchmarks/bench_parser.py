@@ -0,0 +1,102 @@
+"""Compare the cloudcast parser with the former two-pass parsing.
+
+Both sides build the same `Track` fields; the parser runs without a search
+index so only parsing is measured. The runs are interleaved and the median
+of ``--runs`` is reported.
+
+Run with ``python benchmarks/bench_parser.py [--runs 9]``.
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mopidy.models import Artist, Track  # noqa
+
+from mopidy_mixcloud.parser import CloudcastParser  # noqa
+from mopidy_mixcloud.records import ALBUM, RecordStore  # noqa
+
+import fixtures  # noqa
+
+
+def legacy_add_cloudcast(index, json):
+    # The infolabels pass get_user_stream used to run on every item
+    genre = ''
+    for tag in json.get('tags') or []:
+        if tag.get('name'):
+            if genre != '':
+                genre += ', '
+            genre = genre + tag['name']
+    structtime = time.strptime(json['created_time'][0:10], '%Y-%m-%d')
+    return {
+        'count': index, 'tracknumber': index, 'title': json['name'],
+        'artist': json['user']['name'], 'duration': json['audio_length'],
+        'year': int(time.strftime('%Y', structtime)),
+        'date': time.strftime('%d/%m/Y', structtime),
+        'comment': json['description'].encode('ascii', 'ignore'),
+        'genre': genre, 'key': json['key'],
+    }
+
+
+def legacy_parse_track(data):
+    # The Track pass, one Artist per item, with the fields the parser fills
+    user = data['user']
+    tags = [tag['name'] for tag in data.get('tags') or [] if tag.get('name')]
+    return Track(
+        uri='mixcloud:' + data['key'], name=data['name'],
+        artists=[Artist(name=user['name'], uri='mixcloud:user:' + user['key'])],
+        album=ALBUM, length=int(data['audio_length']) * 1000,
+        date=data['created_time'][:10], genre=', '.join(tags) or None,
+        comment=data['url'])
+
+
+def legacy(items):
+    infolabels = [legacy_add_cloudcast(0, item) for item in items]
+    return list(filter(None, infolabels)), [
+        legacy_parse_track(item) for item in items]
+
+
+def current(items):
+    return CloudcastParser(RecordStore(), index=None).parse_page(items)
+
+
+def median(samples):
+    samples = sorted(samples)
+    middle = len(samples) // 2
+    if len(samples) % 2:
+        return samples[middle]
+    return (samples[middle - 1] + samples[middle]) / 2
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=9)
+    parser.add_argument('--number', type=int, default=3,
+                        help='pages parsed per run')
+    args = parser.parse_args(argv)
+    items = [item['cloudcasts'][0] for item in fixtures.feed(1000)['data']]
+    assert [t.uri for t in legacy(items)[1]] == \
+        [t.uri for t in current(items)]
+    funcs = (('legacy', legacy), ('parser', current))
+    samples = dict((name, []) for name, _ in funcs)
+    for run in range(args.runs):
+        # alternate the order so drift affects both sides alike
+        for name, func in funcs[::1 if run % 2 else -1]:
+            samples[name].append(timeit.timeit(
+                lambda: func(items), number=args.number) / args.number)
+    for name, _ in funcs:
+        print('%-8s %8.2f ms per 1000 cloudcasts (median of %d, '
+              'range %.2f-%.2f)' % (
+                  name, median(samples[name]) * 1000, args.runs,
+                  min(samples[name]) * 1000, max(samples[name]) * 1000))
+    print('legacy/parser %.2fx' % (
+        median(samples['legacy']) / median(samples['parser'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Compare the memory held by compact cloudcast records with `Track`
+objects.
+
+Run with ``python benchmarks/bench_records.py [--count 100000]``.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mopidy.models import Album, Artist, Track  # noqa
+
+from mopidy_mixcloud.images import picture_source  # noqa
+from mopidy_mixcloud.records import RecordStore  # noqa
+
+import fixtures  # noqa
+
+SHARED = (type, types.ModuleType, types.FunctionType,
+          types.BuiltinFunctionType)
+
+
+def deep_size(root):
+    """Bytes of every object reachable from ``root``, counted once"""
+    seen = set()
+    stack = [root]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SHARED):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+def pages(count, page_size=1000):
+    # decoded from JSON like API responses, so no strings are shared
+    for start in range(0, count, page_size):
+        page = fixtures.cloudcasts(min(page_size, count - start), start)
+        yield json.loads(json.dumps(page))['data']
+
+
+def legacy(count):
+    # Tracks with interned artists plus the picture source of every uri, as
+    # the parser and image index used to keep them
+    album = Album(name='Mixcloud')
+    artists = {}
+    tracks = {}
+    pictures = {}
+    for page in pages(count):
+        for data in page:
+            user = data['user']
+            artist = artists.get(user['key'])
+            if artist is None:
+                artist = artists[user['key']] = Artist(
+                    name=user['name'], uri='mixcloud:user:' + user['key'])
+                pictures[artist.uri] = picture_source(user['pictures'])
+            track = Track(
+                uri='mixcloud:' + data['key'], name=data['name'],
+                artists=[artist], album=album,
+                length=data['audio_length'] * 1000,
+                date=data['created_time'][:10],
+                genre=', '.join(tag['name'] for tag in data['tags']),
+                comment=data['url'])
+            tracks[track.uri] = track
+            pictures[track.uri] = picture_source(data['pictures'])
+    return tracks, pictures
+
+
+def records(count):
+    store = RecordStore(maxsize=count)
+    for page in pages(count):
+        for data in page:
+            store.add(data)
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args(argv)
+    results = {}
+    for name, func in (('tracks', legacy), ('records', records)):
+        start = time.time()
+        held = func(args.count)
+        elapsed = time.time() - start
+        results[name] = deep_size(held)
+        print('%-8s %8.1f MB %6d bytes per cloudcast  built in %.1f s' % (
+            name, results[name] / 1048576.0,
+            results[name] // args.count, elapsed))
+        del held
+    print('reduction %.1fx' % (float(results['tracks']) / results['records']))
+
+
+if __name__ == '__main__':
+    main()
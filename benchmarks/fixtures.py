@@ -0,0 +1,111 @@
+"""Mixcloud API payloads in the shape of recorded responses.
+
+The payloads are generated deterministically so benchmarks can run offline
+without shipping megabytes of JSON.
+"""
+from __future__ import unicode_literals
+
+import base64
+import json
+import random
+from itertools import cycle
+
+MAGIC_KEY = base64.b64decode(
+    b'cGxlYXNlZG9udGRvd25sb2Fkb3VybXVzaWN0aGVhcnRpc3Rzd29udGdldHBhaWQ=')
+
+TAGS = ['House', 'Deep House', 'Techno', 'Drum & Bass', 'Ambient', 'Disco',
+        'Jazz', 'Hip Hop', 'Electronica', 'Dubstep', 'Funk', 'Soul']
+
+
+def user(i):
+    key = '/dj-%d/' % i
+    return {
+        'key': key,
+        'url': 'https://www.mixcloud.com' + key,
+        'name': 'DJ %d' % i,
+        'username': 'dj-%d' % i,
+        'pictures': dict(
+            (size, 'https://thumbnailer.mixcloud.com/unsafe/%s/profile/%d'
+             % (dim, i)) for size, dim in (
+                ('small', '25x25'), ('thumbnail', '50x50'),
+                ('medium', '100x100'), ('large', '300x300'),
+                ('extra_large', '600x600'))),
+    }
+
+
+def cloudcast(i, rng=None):
+    rng = rng or random.Random(i)
+    owner = user(i % 97)
+    slug = 'mix-session-%d' % i
+    key = '%s%s/' % (owner['key'], slug)
+    return {
+        'key': key,
+        'url': 'https://www.mixcloud.com' + key,
+        'name': 'Mix Session %d' % i,
+        'slug': slug,
+        'tags': [{'key': '/discover/%s/' % t.lower(), 'name': t,
+                  'url': 'https://www.mixcloud.com/discover/%s/' % t.lower()}
+                 for t in rng.sample(TAGS, 3)],
+        'created_time': '2015-%02d-%02dT%02d:00:00Z' % (
+            i % 12 + 1, i % 28 + 1, i % 24),
+        'updated_time': '2015-%02d-%02dT%02d:00:00Z' % (
+            i % 12 + 1, i % 28 + 1, i % 24),
+        'play_count': rng.randint(0, 100000),
+        'favorite_count': rng.randint(0, 1000),
+        'listener_count': rng.randint(0, 10000),
+        'repost_count': rng.randint(0, 100),
+        'audio_length': rng.randint(1800, 7200),
+        'description': 'Recorded live, session %d. ' % i * 5,
+        'user': owner,
+        'pictures': owner['pictures'],
+    }
+
+
+def feed(n=1000, page=None, start=0):
+    """Feed response holding ``n`` cloudcasts from the ``start``-th one"""
+    return {
+        'data': [{'type': 'upload', 'cloudcasts': [cloudcast(i)]}
+                 for i in range(start, start + n)],
+        'paging': {'next': page},
+    }
+
+
+def cloudcasts(n=1000, start=0):
+    """List endpoint response (uploads, favorites, ...) of ``n`` cloudcasts
+    from the ``start``-th one"""
+    return {'data': [cloudcast(i) for i in range(start, start + n)],
+            'paging': {}}
+
+
+def categories():
+    return {'data': [
+        {'key': '/categories/%s/' % slug, 'slug': slug, 'name': tag,
+         'url': 'https://www.mixcloud.com/categories/%s/' % slug}
+        for slug, tag in ((t.lower().replace(' & ', '-').replace(' ', '-'), t)
+                          for t in TAGS)]}
+
+
+def play_info(key):
+    """Encoded ``m-play-info`` attribute for the cloudcast ``key``"""
+    info = json.dumps({
+        'stream_url': 'https://stream12.mixcloud.com/c/m4a/64%s.m4a'
+                      '?sig=abcdef0123456789&exp=1893456000' % key.rstrip('/'),
+        'preview_url': 'https://preview.mixcloud.com/previews%s.mp3' % key,
+        'cloudcast_key': key,
+    }).encode('ascii')
+    return base64.b64encode(b''.join(
+        chr(ord(a) ^ ord(b)) for a, b in zip(info, cycle(MAGIC_KEY))))
+
+
+def cloudcast_page(key, size=250000):
+    """Cloudcast HTML page of about ``size`` bytes, the play info sits
+    roughly a third into the page as on the real site"""
+    filler = b'<div class="filler">' + b'x' * 200 + b'</div>\n'
+    head = b'<html><head><title>%s</title></head><body>\n' % key.encode(
+        'utf-8')
+    before = filler * (size // 3 // len(filler))
+    after = filler * (2 * size // 3 // len(filler))
+    return (head + before +
+            b'<div m-p-ref="cloudcast_page" m-play-info="' + play_info(key) +
+            b'" m-preview="https://preview.mixcloud.com/x.mp3"></div>\n' +
+            after + b'</body></html>')
@@ -0,0 +1,217 @@
+"""Benchmark the backend hot paths against a local fixture server.
+
+Run with ``python benchmarks/run.py``, or ``tox -e bench`` to run it with
+the other benchmarks; no network access is needed. Every scenario reports
+latency percentiles, throughput, allocated objects and HTTP requests per
+operation. ``--json FILE`` writes the numbers for CI.
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+from mopidy_mixcloud import mixcloud  # noqa
+from mopidy_mixcloud.actor import MixcloudPlaybackProvider  # noqa
+from mopidy_mixcloud.library import MixcloudLibraryProvider  # noqa
+from mopidy_mixcloud.streams import StreamPrefetcher, StreamUrlCache  # noqa
+
+import fixtures  # noqa
+from server import FixtureServer  # noqa
+
+
+CONFIG = {
+    'username': 'dj-1',
+    'persistent_cache': False,
+    'rate_limit': 0,
+    'http_retries': 0,
+    'prefetch_depth': 0,
+}
+
+
+class Backend(object):
+    """The parts of MixcloudBackend the providers use"""
+
+    def __init__(self, config):
+        self.config = {'mixcloud': config}
+        self.remote = mixcloud.MixcloudClient(config)
+        self.streams = StreamUrlCache()
+        self.prefetcher = StreamPrefetcher(
+            self.remote.get_track_uri, self.streams, depth=0)
+        self.library = MixcloudLibraryProvider(backend=self)
+        self.playback = MixcloudPlaybackProvider(audio=None, backend=self)
+
+    def close(self):
+        self.remote.close()
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class Allocations(object):
+
+    def __enter__(self):
+        gc.collect()
+        if tracemalloc:
+            tracemalloc.start()
+        else:
+            self.before = len(gc.get_objects())
+        return self
+
+    def __exit__(self, *exc):
+        if tracemalloc:
+            self.value = tracemalloc.get_traced_memory()[1]
+            self.unit = 'bytes'
+            tracemalloc.stop()
+        else:
+            self.value = len(gc.get_objects()) - self.before
+            self.unit = 'objects'
+
+
+def measure(server, name, setup, op, iterations):
+    """Time ``op(state)`` on a fresh ``setup()`` state per iteration"""
+    samples = []
+    requests = 0
+    states = [setup() for _ in range(iterations)]
+    with Allocations() as allocations:
+        for state in states:
+            before = server.requests
+            start = time.time()
+            op(state)
+            samples.append(time.time() - start)
+            requests += server.requests - before
+    for state in states:
+        if hasattr(state, 'close'):
+            state.close()
+    total = sum(samples)
+    return {
+        'name': name,
+        'iterations': iterations,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p90_ms': percentile(samples, 90) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'ops_per_s': iterations / total if total else float('inf'),
+        'allocations': allocations.value // iterations,
+        'allocation_unit': allocations.unit,
+        'requests_per_op': requests / iterations,
+    }
+
+
+def scenarios(server, size):
+    keys = ['/dj-%d/mix-session-%d/' % (i % 97, i) for i in range(size)]
+    uris = ['mixcloud:' + key for key in keys]
+    page = [item['cloudcasts'][0] for item in fixtures.feed(size)['data']]
+
+    def backend():
+        return Backend(dict(CONFIG))
+
+    def indexed():
+        state = backend()
+        state.remote.explore.cloudcasts('techno')
+        # let the background fill of the other categories finish
+        while state.remote._revalidating:
+            time.sleep(0.01)
+        return state
+
+    def degraded():
+        config = dict(CONFIG, http_read_timeout=200, circuit_threshold=3)
+        return Backend(config)
+
+    def warm_stream():
+        state = backend()
+        state.playback.translate_uri(uris[0])
+        return state
+
+    return [
+        ('parse_page x%d' % size, backend,
+         lambda b: b.remote.parser.parse_page(page)),
+        ('list_feed cold', backend,
+         lambda b: b.library.browse('mixcloud:directory:feed')),
+        ('browse favorites cold', backend,
+         lambda b: b.library.browse(
+             'mixcloud:directory:cloudcasts/dj-1/favorites')),
+        ('browse favorites 5 pages', backend,
+         lambda b: [b.library.browse(
+             'mixcloud:directory:cloudcasts/dj-1/favorites@%d' % offset)
+             for offset in range(0, 100, 20)]),
+        ('browse category cold', backend,
+         lambda b: b.library.browse('mixcloud:directory:explore/techno')),
+        ('browse category indexed', indexed,
+         lambda b: b.library.browse('mixcloud:directory:explore/techno')),
+        ('refresh category index', backend,
+         lambda b: b.remote.explore.refresh(
+             [slug for slug, _ in b.remote.explore.categories()])),
+        ('lookup cold', backend,
+         lambda b: b.library.lookup(uris[1])),
+        ('lookup x100 cold', backend,
+         lambda b: [b.library.lookup(uri) for uri in uris[:100]]),
+        ('lookup favorites folder', backend,
+         lambda b: b.library.lookup(
+             'mixcloud:directory:cloudcasts/dj-1/favorites')),
+        ('get_track_uri cold', backend,
+         lambda b: b.remote.get_track_uri(keys[2])),
+        ('translate_uri warm', warm_stream,
+         lambda b: b.playback.translate_uri(uris[0])),
+        ('lookup x10 stalled API', degraded,
+         lambda b: [b.library.lookup('mixcloud:/stalled/mix-session-%d/' % i)
+                    for i in range(10)]),
+    ]
+
+
+def report(results):
+    print('%-24s %9s %9s %9s %9s %12s %8s' % (
+        'scenario', 'p50 ms', 'p90 ms', 'p99 ms', 'ops/s', 'allocs/op',
+        'req/op'))
+    for r in results:
+        print('%-24s %9.2f %9.2f %9.2f %9.1f %12d %8.1f' % (
+            r['name'], r['p50_ms'], r['p90_ms'], r['p99_ms'],
+            r['ops_per_s'], r['allocations'], r['requests_per_op']))
+    if results:
+        print('allocations in %s' % results[0]['allocation_unit'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--size', type=int, default=1000,
+                        help='items per fixture list')
+    parser.add_argument('--only', help='run scenarios containing this text')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--metrics', action='store_true',
+                        help='collect in-process metrics while measuring')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.metrics:
+        CONFIG['metrics'] = 'snapshot'
+    server = FixtureServer(size=args.size).start()
+    mixcloud.URL_API = server.api_url
+    mixcloud.URL_MIXCLOUD = server.www_url
+
+    results = []
+    for name, setup, op in scenarios(server, args.size):
+        if args.only and args.only not in name:
+            continue
+        results.append(measure(server, name, setup, op, args.iterations))
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
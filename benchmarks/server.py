@@ -0,0 +1,129 @@
+"""Local stand-in for the Mixcloud API and website.
+
+Serves the payloads from :mod:`fixtures` so benchmarks run offline:
+
+- ``/api/<user>/feed/?limit=&offset=`` feed pages
+- ``/api/<user>/<list>/?limit=&offset=`` cloudcast lists
+- ``/api/categories/`` and ``/api/categories/<slug>/cloudcasts/`` the
+  categories and their cloudcasts, ``/api/popular/hot/`` the hot list
+- ``/api/<user>/<cloudcast>/`` single cloudcasts
+- ``/www/<user>/<cloudcast>/`` cloudcast HTML pages with the play info
+- ``/api/stalled/...`` a degraded API answering 503 after ``stall`` seconds
+"""
+from __future__ import unicode_literals
+
+import json
+import re
+import threading
+import time
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+except ImportError:  # pragma: no cover
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+
+import fixtures
+
+CLOUDCAST_RE = re.compile(r'^/dj-\d+/mix-session-(\d+)/$')
+LISTS = ('feed', 'cloudcasts', 'favorites', 'listen-later')
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # write each response in one go, split writes stall on delayed ACKs
+    wbufsize = -1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.count(self.path)
+        url = urlparse(self.path)
+        path = url.path
+        if path.startswith('/www/'):
+            match = CLOUDCAST_RE.match(path[4:])
+            if match:
+                return self.reply(
+                    fixtures.cloudcast_page(path[4:]), 'text/html')
+        elif path.startswith('/api/stalled/'):
+            time.sleep(self.server.stall)
+            return self.reply(b'{}', 'application/json', status=503)
+        elif path.startswith('/api/'):
+            body = self.api(path[4:], parse_qs(url.query))
+            if body is not None:
+                return self.reply(
+                    json.dumps(body).encode('utf-8'), 'application/json')
+        self.reply(b'{}', 'application/json', status=404)
+
+    def api(self, path, query):
+        parts = path.strip('/').split('/')
+        if parts == ['categories']:
+            return fixtures.categories()
+        if parts[-1] == 'cloudcasts' and parts[0] == 'categories' or \
+                parts == ['popular', 'hot']:
+            # a different slice of the cloudcasts for every list
+            limit = int(query.get('limit', ['20'])[0])
+            return fixtures.cloudcasts(limit, start=len(parts[-2]) * 7)
+        if len(parts) == 2 and parts[1] in LISTS:
+            limit = int(query.get('limit', ['20'])[0])
+            offset = int(query.get('offset', ['0'])[0])
+            end = min(offset + limit, self.server.size)
+            page = '%s?limit=%d&offset=%d' % (
+                self.server.api_url + path.lstrip('/'), limit, end)
+            if parts[1] == 'feed':
+                body = fixtures.feed(end - offset, start=offset)
+            else:
+                body = fixtures.cloudcasts(end - offset, start=offset)
+            body['paging']['next'] = page if end < self.server.size else None
+            return body
+        match = CLOUDCAST_RE.match(path)
+        if match:
+            return fixtures.cloudcast(int(match.group(1)))
+        return None
+
+    def reply(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FixtureServer(ThreadingMixIn, HTTPServer):
+    """Threaded fixture server counting the requests it answers
+
+    :param size: number of items in every list endpoint
+    :param stall: seconds the stalled endpoints take to answer
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, size=1000, stall=2):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), Handler)
+        self.size = size
+        self.stall = stall
+        self.requests = 0
+        self._lock = threading.Lock()
+        base = 'http://127.0.0.1:%d/' % self.server_port
+        self.api_url = base + 'api/'
+        self.www_url = base + 'www/'
+
+    def handle_error(self, request, client_address):
+        # clients hang up mid-page on purpose once they found the play info
+        pass
+
+    def count(self, path):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
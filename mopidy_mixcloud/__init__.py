@@ -21,8 +21,54 @@ class MixcloudExtension(ext.Extension):
 
     def get_config_schema(self):
         schema = super(MixcloudExtension, self).get_config_schema()
-        #schema['explore_songs'] = config.Integer()
+        schema['username'] = config.String()
+        schema['explore_songs'] = config.Integer()
         #schema['auth_token'] = config.Secret()
+        schema['cache_size'] = config.Integer(minimum=1)
+        schema['cache_ttl'] = config.Integer(minimum=0)
+        schema['persistent_cache'] = config.Boolean()
+        schema['persistent_cache_days'] = config.Integer(minimum=0)
+        schema['stream_ttl'] = config.Integer(minimum=1)
+        schema['stream_expiry_margin'] = config.Integer(minimum=0)
+        schema['prefetch_depth'] = config.Integer(minimum=0)
+        schema['prefetch_workers'] = config.Integer(minimum=1)
+        schema['feed_page_size'] = config.Integer(minimum=1, maximum=100)
+        schema['feed_max_pages'] = config.Integer(minimum=1)
+        schema['list_page_size'] = config.Integer(minimum=1, maximum=100)
+        schema['list_window'] = config.Integer(minimum=1)
+        schema['feed_snapshot_size'] = config.Integer(minimum=1)
+        schema['lookup_workers'] = config.Integer(minimum=1)
+        schema['lookup_max_tracks'] = config.Integer(minimum=1)
+        schema['http_pool_size'] = config.Integer(minimum=1, optional=True)
+        schema['http_retries'] = config.Integer(minimum=0)
+        schema['http_backoff'] = config.Integer(minimum=0)
+        schema['http_connect_timeout'] = config.Integer(minimum=1)
+        schema['http_read_timeout'] = config.Integer(minimum=1)
+        schema['page_read_timeout'] = config.Integer(minimum=1)
+        schema['circuit_threshold'] = config.Integer(minimum=1)
+        schema['circuit_reset'] = config.Integer(minimum=1)
+        schema['http_cache_size'] = config.Integer(minimum=0)
+        schema['rate_limit'] = config.Integer(minimum=0)
+        schema['rate_burst'] = config.Integer(minimum=1)
+        schema['io_engine'] = config.String(choices=['threads', 'tornado'])
+        schema['io_max_inflight'] = config.Integer(minimum=1)
+        schema['search_index_size'] = config.Integer(minimum=0)
+        schema['record_store_size'] = config.Integer(minimum=1)
+        schema['search_min_length'] = config.Integer(minimum=1)
+        schema['search_debounce'] = config.Integer(minimum=0)
+        schema['background_refresh'] = config.Boolean()
+        schema['refresh_margin'] = config.Integer(minimum=0)
+        schema['refresh_feed'] = config.Integer(minimum=0, optional=True)
+        schema['refresh_favorites'] = config.Integer(minimum=0, optional=True)
+        schema['refresh_hot'] = config.Integer(minimum=0, optional=True)
+        schema['refresh_categories'] = config.Integer(minimum=0, optional=True)
+        schema['refresh_jitter'] = config.Integer(minimum=0, maximum=50)
+        schema['image_sizes'] = config.List()
+        schema['thumbnail_cache_size'] = config.Integer(minimum=0)
+        schema['metrics'] = config.String(
+            choices=['off', 'snapshot', 'prometheus', 'statsd'])
+        schema['metrics_target'] = config.String(optional=True)
+        schema['metrics_interval'] = config.Integer(minimum=1)
         return schema
 
     def validate_config(self, config):  # no_coverage
@@ -32,3 +78,17 @@ class MixcloudExtension(ext.Extension):
     def setup(self, registry):
         from .actor import MixcloudBackend
         registry.add('backend', MixcloudBackend)
+
+        from .frontend import MixcloudPrefetchFrontend
+        registry.add('frontend', MixcloudPrefetchFrontend)
+
+        registry.add('http:app', {
+            'name': self.ext_name,
+            'factory': thumbnail_app,
+        })
+
+
+def thumbnail_app(config, core):
+    # imported here so Tornado is only loaded along with Mopidy-HTTP
+    from .web import thumbnail_app
+    return thumbnail_app(config, core)
@@ -1,34 +1,129 @@
 from __future__ import unicode_literals
 
 import logging
+import os
 
 from mopidy import backend
 
 import pykka
 
-from .library import MixcloudLibraryProvider
+from . import MixcloudExtension
+from .explore import HOT
+from .library import LISTING_TTLS, MixcloudLibraryProvider
+from .metrics import create_metrics, timed
 from .mixcloud import MixcloudClient
+from .streams import StreamPrefetcher, StreamUrlCache
 
 
 logger = logging.getLogger(__name__)
 
 
+def refresh_interval(ttl, margin):
+    """Seconds between refreshes of a resource cached for ``ttl`` seconds,
+    ``margin`` before it expires but no more often than every ``ttl / 2``"""
+    return max(ttl - margin, ttl // 2)
+
+
 class MixcloudBackend(pykka.ThreadingActor, backend.Backend):
 
     def __init__(self, config, audio):
         super(MixcloudBackend, self).__init__()
         logger.debug("Mixcloud Backend starting")
         self.config = config
-        self.remote = MixcloudClient(config['mixcloud'])
+        self.store = None
+        if config['mixcloud'].get('persistent_cache', True):
+            # sqlite3 is only imported when the store is enabled
+            from .store import MetadataStore
+            self.store = MetadataStore(
+                os.path.join(
+                    MixcloudExtension.get_cache_dir(config), 'metadata.db'),
+                max_age=config['mixcloud'].get(
+                    'persistent_cache_days', 30) * 24 * 3600)
+        self.metrics = create_metrics(config['mixcloud'])
+        self.remote = MixcloudClient(
+            config['mixcloud'], store=self.store, metrics=self.metrics)
+        self.streams = StreamUrlCache(
+            ttl=config['mixcloud'].get('stream_ttl', 600),
+            margin=config['mixcloud'].get('stream_expiry_margin', 30))
+        self.prefetcher = StreamPrefetcher(
+            self.remote.get_track_uri, self.streams,
+            depth=config['mixcloud'].get('prefetch_depth', 2),
+            workers=config['mixcloud'].get('prefetch_workers', 2))
         self.library = MixcloudLibraryProvider(backend=self)
         self.playback = MixcloudPlaybackProvider(audio=audio, backend=self)
+        self.metrics.register('streams', self.streams.stats)
+        self.metrics.register('prefetch', self.prefetcher.stats)
+        self.scheduler = self.create_scheduler(config['mixcloud'])
+        self.metrics.register('refresh', self.scheduler.stats)
 
         self.uri_schemes = ['mixcloud', 'mc']
 
+    def create_scheduler(self, config):
+        """Refresh the feed, favorites, hot list and category index every
+        ``refresh_<name>`` seconds, by default ``refresh_margin`` seconds
+        before their caches expire"""
+        scheduler = self.remote.scheduler
+        if not config.get('background_refresh', True):
+            return scheduler
+        margin = config.get('refresh_margin', 60)
+        ttl = self.remote.cache_ttl
+
+        def interval(name, ttl):
+            seconds = config.get('refresh_' + name)
+            if seconds is None:
+                seconds = refresh_interval(ttl, margin)
+            return seconds
+
+        listing = self.library.refresh_listing
+        scheduler.add(
+            'feed', interval('feed', ttl), self.remote.feed.sync)
+        scheduler.add(
+            'favorites', interval('favorites', LISTING_TTLS['favorites']),
+            lambda: listing(self.library.favorites_uri))
+        scheduler.add(
+            'hot', interval('hot', ttl),
+            lambda: self.remote.explore.refresh([HOT]))
+        scheduler.add(
+            'categories', interval('categories', ttl),
+            self.remote.explore.refresh)
+        return scheduler
+
+    def prefetch(self, uris):
+        """Resolve stream urls for the upcoming ``uris`` in the background"""
+        self.prefetcher.schedule([
+            uri.replace('mixcloud:', '') for uri in uris
+            if uri.startswith('mixcloud:')])
+
+    def metrics_snapshot(self):
+        """Current counters, timers and cache statistics as a flat dict"""
+        return self.metrics.snapshot()
+
+    def on_start(self):
+        self.metrics.start()
+        self.scheduler.start()
+
+    def on_stop(self):
+        self.scheduler.stop()
+        self.metrics.stop()
+        self.prefetcher.stop()
+        self.remote.close()
+        if self.store:
+            self.store.close()
+
 
 class MixcloudPlaybackProvider(backend.PlaybackProvider):
 
+    @property
+    def metrics(self):
+        return self.backend.remote.metrics
+
+    @timed('translate_uri')
     def translate_uri(self, uri):
         logger.debug('translate track from %s' % uri)
         uri = uri.replace('mixcloud:', '')
-        return self.backend.remote.get_track_uri(uri)
+        stream = self.backend.streams.get(uri)
+        self.backend.prefetcher.played(uri, stream is not None)
+        if stream is None:
+            stream = self.backend.remote.get_track_uri(uri)
+            self.backend.streams.put(uri, stream)
+        return stream
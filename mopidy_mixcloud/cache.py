@@ -0,0 +1,184 @@
+from __future__ import unicode_literals
+
+import collections
+import functools
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache(object):
+    """Thread safe, size bounded LRU cache with a per entry time to live.
+
+    :param maxsize: maximum number of entries kept, least recently used
+        entries are evicted first
+    :param ttl: default time to live of an entry in seconds, ``None`` or
+        ``0`` keeps entries until they are evicted
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        with self._lock:
+            try:
+                value, expires = self._data.pop(key)
+            except KeyError:
+                if count:
+                    self.misses += 1
+                return default
+            if expires and expires <= self.timer():
+                self.expirations += 1
+                if count:
+                    self.misses += 1
+                return default
+            self._data[key] = (value, expires)
+            if count:
+                self.hits += 1
+            return value
+
+    def get_stale(self, key, default=None):
+        """Like :meth:`get`, but expired entries are returned instead of
+        dropped so they can be served while they are fetched again
+
+        :return: tuple of the value or ``default`` and whether it is fresh
+        """
+        with self._lock:
+            try:
+                value, expires = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default, False
+            self._data[key] = (value, expires)
+            if expires and expires <= self.timer():
+                self.stale_hits += 1
+                return value, False
+            self.hits += 1
+            return value, True
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires = self.timer() + ttl if ttl else 0
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def expires_at(self, key):
+        """Return the expiry timestamp of ``key``, ``0`` if it never expires
+        and ``None`` if it is not cached."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[1] if entry else None
+
+    def invalidate(self, key):
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'stale_hits': self.stale_hits,
+            }
+
+
+class cache(object):
+    """Memoize a method in a :class:`LRUCache` owned by the instance.
+
+    The cache lives on the instance, so it does not keep the instance alive
+    and every client gets its own bounds. Instances may define
+    ``cache_size`` and ``cache_ttl`` to override the decorator defaults.
+    Calls with unhashable arguments are passed through uncached.
+
+    The wrapped method gains ``refresh(instance, *args)`` to refetch a
+    single key and ``cache_for(instance)`` to reach the underlying cache.
+
+    With ``stale=True`` an expired value keeps being returned while
+    ``instance.revalidate(key, func, *args)`` refetches it in the
+    background.
+    """
+
+    def __init__(self, maxsize=None, ttl=None, stale=False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale = stale
+
+    def __call__(self, func):
+        attr = '_cache_%s' % func.__name__
+        lock = threading.Lock()
+
+        def cache_for(instance):
+            store = instance.__dict__.get(attr)
+            if store is None:
+                with lock:
+                    store = instance.__dict__.get(attr)
+                    if store is None:
+                        store = LRUCache(
+                            maxsize=self.maxsize or getattr(
+                                instance, 'cache_size', 1024),
+                            ttl=self.ttl if self.ttl is not None else getattr(
+                                instance, 'cache_ttl', 3600))
+                        instance.__dict__[attr] = store
+            return store
+
+        def refresh(instance, *args):
+            value = func(instance, *args)
+            try:
+                cache_for(instance).set(args, value)
+            except TypeError:
+                pass
+            return value
+
+        @functools.wraps(func)
+        def _memoized(instance, *args):
+            store = cache_for(instance)
+            try:
+                if self.stale:
+                    value, fresh = store.get_stale(args, _MISSING)
+                    if value is not _MISSING and not fresh:
+                        instance.revalidate(
+                            (attr,) + args, refresh, instance, *args)
+                else:
+                    value = store.get(args, _MISSING)
+            except TypeError:
+                return func(instance, *args)
+            if value is _MISSING:
+                value = refresh(instance, *args)
+            return value
+
+        _memoized.cache_for = cache_for
+        _memoized.refresh = refresh
+        return _memoized
@@ -0,0 +1,100 @@
+from __future__ import unicode_literals
+
+import base64
+import json
+import logging
+from binascii import hexlify, unhexlify
+
+logger = logging.getLogger(__name__)
+
+MAGIC_KEY = base64.b64decode(
+    b'cGxlYXNlZG9udGRvd25sb2Fkb3VybXVzaWN0aGVhcnRpc3Rzd29udGdldHBhaWQ=')
+
+PLAY_INFO_START = b'm-p-ref="cloudcast_page" m-play-info="'
+PLAY_INFO_END = b'"'
+
+# Payloads are a few hundred bytes, bigger ones are worth handing to NumPy
+NUMPY_THRESHOLD = 4096
+
+_numpy = []
+
+
+def load_numpy():
+    """Import NumPy on first use, it is slow to import and rarely needed
+
+    :return: the numpy module or ``None`` if it is not installed
+    """
+    if not _numpy:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover
+            numpy = None
+        _numpy.append(numpy)
+    return _numpy[0]
+
+
+class PlayInfoDecoder(object):
+    """Decode the XOR obfuscated ``m-play-info`` of a cloudcast page.
+
+    The repeated key is kept between calls so decoding a payload is a
+    single bulk XOR.
+
+    :param key: XOR key, the Mixcloud magic string by default
+    """
+
+    def __init__(self, key=MAGIC_KEY):
+        self.key = key
+        self._stream = key
+
+    def keystream(self, length):
+        if len(self._stream) < length:
+            self._stream = self.key * (length // len(self.key) + 1)
+        return self._stream[:length]
+
+    def xor(self, data):
+        length = len(data)
+        if not length:
+            return b''
+        stream = self.keystream(length)
+        numpy = load_numpy() if length >= NUMPY_THRESHOLD else None
+        if numpy is not None:
+            return numpy.bitwise_xor(
+                numpy.frombuffer(data, numpy.uint8),
+                numpy.frombuffer(stream, numpy.uint8)).tobytes()
+        value = int(hexlify(data), 16) ^ int(hexlify(stream), 16)
+        return unhexlify(b'%0*x' % (2 * length, value))
+
+    def decode(self, encoded):
+        """Decode a base64 ``m-play-info`` value into its JSON dict"""
+        return json.loads(self.xor(base64.b64decode(encoded)))
+
+
+def find_play_info(chunks, max_bytes=2 * 1024 * 1024):
+    """Find the ``m-play-info`` attribute in a streamed page
+
+    Reading stops as soon as the attribute is complete.
+
+    :param chunks: iterable of byte strings, e.g. ``response.iter_content()``
+    :param max_bytes: give up after reading this many bytes
+    :return: tuple of the encoded value or ``None`` and the bytes read
+    """
+    buf = b''
+    read = 0
+    start = -1
+    for chunk in chunks:
+        read += len(chunk)
+        buf += chunk
+        if start < 0:
+            start = buf.find(PLAY_INFO_START)
+            if start < 0:
+                # keep enough to match a marker split across chunks
+                buf = buf[-len(PLAY_INFO_START):]
+            else:
+                buf = buf[start + len(PLAY_INFO_START):]
+        if start >= 0:
+            end = buf.find(PLAY_INFO_END)
+            if end >= 0:
+                return buf[:end], read
+        if read >= max_bytes:
+            break
+    return None, read
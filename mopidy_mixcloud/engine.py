@@ -0,0 +1,258 @@
+from __future__ import unicode_literals
+
+import functools
+import json
+import logging
+import threading
+import time
+
+from .throttle import CircuitOpenError, backoff_delay, parse_retry_after
+
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadEngine(object):
+    """Fan requests out over the client's worker pool, one thread per
+    in-flight request."""
+
+    name = 'threads'
+
+    def __init__(self, client):
+        self.client = client
+
+    def get_json_many(self, urls, parse=None):
+        """GET every url concurrently
+
+        :param parse: optional callable applied to each JSON response
+        :return: list of parsed JSON or the result of ``parse``, or the
+            exception raised for a url
+        """
+        return self.client.pool.map(
+            functools.partial(self._try_get_json, parse=parse), urls)
+
+    def _try_get_json(self, url, parse=None):
+        try:
+            return self.client._fetch_json(url, parse)
+        except Exception as e:
+            return e
+
+    def close(self):
+        pass
+
+
+class _Response(object):
+    """The parts of a `requests.Response` the client reads, over a
+    Tornado response"""
+
+    def __init__(self, response):
+        self.response = response
+        self.status_code = response.code
+        self.headers = response.headers
+
+    def json(self):
+        return json.loads(self.response.body)
+
+    def raise_for_status(self):
+        self.response.rethrow()
+
+    def close(self):
+        pass
+
+
+class TornadoEngine(object):
+    """Multiplex requests on a Tornado IOLoop running on its own thread.
+
+    Hundreds of requests can be in flight on the single loop thread, bounded
+    by ``max_inflight``. :meth:`get_json_many` blocks the calling thread
+    until all responses are in or the batch deadline passed, so callers
+    stay synchronous. Requests use the client's API timeouts, rate limiter
+    and circuit breaker. Failed ones are retried like
+    :meth:`MixcloudClient._request` does, in rounds after a jittered
+    backoff while the time budget of the batch lasts. Responses are
+    revalidated and kept in the client's response cache like those of the
+    thread engine, which are served while Mixcloud fails.
+
+    Only API JSON goes through the engine. Stream urls are still resolved
+    on the prefetcher's threads since they read cloudcast pages partially.
+    """
+
+    name = 'tornado'
+
+    def __init__(self, client, max_inflight=64):
+        from tornado import httpclient, ioloop
+        self.client = client
+        self.max_inflight = max_inflight
+        self.connect_timeout, read_timeout = client.timeouts['api']
+        self.timeout = self.connect_timeout + read_timeout
+        self._httpclient = httpclient
+        self._loop = None
+        self._http = None
+        ready = threading.Event()
+
+        def run():
+            # the loop belongs to this thread, so it is created here
+            self._loop = ioloop.IOLoop()
+            self._loop.make_current()
+            self._http = httpclient.AsyncHTTPClient(
+                force_instance=True, max_clients=max_inflight)
+            ready.set()
+            self._loop.start()
+            self._http.close()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name='MixcloudIOLoop')
+        self._thread.daemon = True
+        self._thread.start()
+        ready.wait()
+
+    def get_json_many(self, urls, parse=None):
+        """GET every url concurrently on the loop
+
+        :param parse: optional callable applied to each JSON response on
+            the calling thread
+        :return: list of parsed JSON or the result of ``parse``, or the
+            exception raised for a url
+        """
+        client = self.client
+        revalidations = [client._revalidation(url, parse) for url in urls]
+        responses = [None] * len(urls)
+        # retries share the time a single round of the batch may take
+        deadline = time.time() + self.timeout * self.rounds(len(urls))
+        pending = list(range(len(urls)))
+        retries = client.http_retries
+        for attempt in range(retries + 1):
+            retry = []
+            fetched = self._fetch([urls[i] for i in pending],
+                                  [revalidations[i][1] for i in pending])
+            for i, response in zip(pending, fetched):
+                responses[i] = response
+                if self._retryable(response):
+                    retry.append(i)
+            delay = backoff_delay(attempt, client.http_backoff)
+            if not retry or attempt == retries or \
+                    time.time() + delay + self.connect_timeout >= deadline:
+                break
+            client.metrics.incr('http.retries', len(retry))
+            time.sleep(delay)
+            pending = retry
+        return [self._result(url, parse, cached, response)
+                for url, (cached, _), response
+                in zip(urls, revalidations, responses)]
+
+    def _result(self, url, parse, cached, response):
+        """What :meth:`MixcloudClient._fetch_validated` makes of a response
+        or error, on the calling thread"""
+        try:
+            if isinstance(response, Exception):
+                if cached is None:
+                    return response
+                return self.client._serve_cached(url, cached, response)[0]
+            return self.client._validated(url, parse, cached, response)[0]
+        except Exception as e:
+            return e
+
+    def rounds(self, count):
+        """Rounds of ``max_inflight`` requests needed for ``count``"""
+        return (count - 1) // self.max_inflight + 1
+
+    def _retryable(self, response):
+        if isinstance(response, _Response):
+            return response.status_code >= 500 or \
+                response.status_code == 429
+        # 599 is a timeout or connection error
+        return isinstance(response, self._httpclient.HTTPError) and \
+            response.code >= 500
+
+    def _fetch(self, urls, headers):
+        """GET ``urls`` concurrently once, within one batch deadline
+
+        :param headers: extra headers of each request
+        :return: list of responses, or the exception raised for a url
+        """
+        if not urls:
+            return []
+        results = [None] * len(urls)
+        breaker = self.client.breakers['api']
+        allowed = []
+        for i in range(len(urls)):
+            if breaker.allow():
+                allowed.append(i)
+            else:
+                results[i] = CircuitOpenError('Mixcloud api requests are '
+                                              'paused')
+        if not allowed:
+            return results
+        remaining = [len(allowed)]
+        done = threading.Event()
+        lock = threading.Lock()
+        session_headers = self.client.http_client.headers
+        limiter = self.client.limiter
+
+        def finished(i, future):
+            try:
+                response = future.result()
+                if response.code >= 500:
+                    breaker.failed()
+                else:
+                    breaker.succeeded()
+                if response.code == 429:
+                    limiter.throttled(parse_retry_after(
+                        response.headers.get('Retry-After')))
+                else:
+                    limiter.succeeded()
+                result = _Response(response)
+            except Exception as e:
+                # timeouts and connection errors
+                breaker.failed()
+                result = e
+            with lock:
+                if done.is_set():
+                    return
+                results[i] = result
+                remaining[0] -= 1
+                if not remaining[0]:
+                    done.set()
+
+        def start(i, url):
+            request_headers = dict(session_headers)
+            request_headers.update(headers[i])
+            request = self._httpclient.HTTPRequest(
+                url, headers=request_headers,
+                connect_timeout=self.connect_timeout,
+                request_timeout=self.timeout, use_gzip=True)
+            self._loop.add_future(
+                self._http.fetch(request, raise_error=False),
+                functools.partial(finished, i))
+
+        for i in allowed:
+            limiter.acquire()
+            logger.debug('Requesting %s' % urls[i])
+            self._loop.add_callback(start, i, urls[i])
+        # requests beyond max_inflight queue behind earlier ones
+        if not done.wait(self.timeout * self.rounds(len(allowed)) + 1):
+            logger.warn('Mixcloud requests did not finish in time')
+        with lock:
+            done.set()
+            for i in allowed:
+                if results[i] is None:
+                    results[i] = IOError('Request to %s timed out' % urls[i])
+        return results
+
+    def close(self):
+        self._loop.add_callback(self._loop.stop)
+        self._thread.join(5)
+
+
+ENGINES = {
+    ThreadEngine.name: ThreadEngine,
+    TornadoEngine.name: TornadoEngine,
+}
+
+
+def create_engine(client, config):
+    name = config.get('io_engine') or ThreadEngine.name
+    if name == TornadoEngine.name:
+        return TornadoEngine(
+            client, max_inflight=config.get('io_max_inflight', 64))
+    return ENGINES[name](client)
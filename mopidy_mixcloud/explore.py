@@ -0,0 +1,157 @@
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+EXPLORE_URI = 'mixcloud:directory:explore'
+CATEGORIES_PATH = 'categories/'
+HOT = 'hot'
+HOT_PATH = 'popular/hot/'
+
+
+class CategoryIndex(object):
+    """Precomputed Mixcloud categories and the cloudcasts listed in them.
+
+    The category list is fetched once, then the first ``size`` cloudcasts
+    of every category and of the hot list, under the name ``hot``, are
+    indexed in the background through the client's I/O engine. A category
+    opened before it was indexed is fetched right away. :meth:`refresh`
+    fetches the cloudcasts of the categories opened so far again. Browse
+    reads the pages straight from the index. Both are kept in the
+    metadata store, so a restart starts from the last index.
+
+    :param client: :class:`MixcloudClient` to fetch with
+    :param size: cloudcasts kept per category
+    """
+
+    def __init__(self, client, size=25):
+        self.client = client
+        self.size = size
+        self._categories = None
+        self._pages = {}
+        self._fetched = {}
+        self._opened = set()
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    def categories(self):
+        """Return the categories as a list of ``(slug, name)``"""
+        if self._categories is None:
+            with self._lock:
+                if self._categories is None:
+                    self._load()
+            if self._categories is None:
+                self.refresh_categories()
+        return self._categories or []
+
+    def cloudcasts(self, name):
+        """Return the indexed :class:`Cloudcast` records of a category or
+        ``hot``, fetching them now if they were never indexed"""
+        self.categories()
+        records = self._pages.get(name)
+        if records is None:
+            records = self._index({name: self._path(name)}).get(name, [])
+        if name != HOT:
+            with self._lock:
+                self._opened.add(name)
+        self.client.scheduler.used(
+            HOT if name == HOT else 'categories', self._fetched.get(name))
+        return records
+
+    def refresh_categories(self):
+        """Fetch the category list and index the cloudcasts of the
+        categories not indexed yet in the background"""
+        categories = self.client._get(CATEGORIES_PATH, self.parse_categories)
+        with self._lock:
+            self._categories = categories
+            paths = dict(
+                (name, self._path(name))
+                for name in [slug for slug, _ in categories] + [HOT]
+                if name not in self._pages)
+        self._save(EXPLORE_URI, categories)
+        if paths:
+            self.client.revalidate(EXPLORE_URI, self._index, paths)
+        return categories
+
+    def parse_page(self, result):
+        """Keep the cloudcasts of an API list response as records"""
+        return self.client.parser.parse_records(result.get('data', []))
+
+    def parse_categories(self, result):
+        """Parse an API category list into ``(slug, name)``"""
+        return [
+            (category['slug'], category.get('name') or category['slug'])
+            for category in result.get('data', []) if category.get('slug')]
+
+    def refresh(self, names=None):
+        """Fetch the cloudcasts of the given categories again, the ones
+        opened so far by default
+
+        :return: names whose cloudcasts changed
+        """
+        if names is None:
+            with self._lock:
+                names = sorted(self._opened)
+        if not names or not self._refreshing.acquire(False):
+            return []
+        try:
+            before = dict((name, self._uris(name)) for name in names)
+            pages = self._index(dict(
+                (name, self._path(name)) for name in names))
+        finally:
+            self._refreshing.release()
+        return [name for name in pages
+                if self._uris(name) != before[name]]
+
+    def uri(self, name):
+        return '%s/%s' % (EXPLORE_URI, name)
+
+    def _path(self, name):
+        if name == HOT:
+            return HOT_PATH
+        return '%s%s/cloudcasts/' % (CATEGORIES_PATH, name)
+
+    def _uris(self, name):
+        return [track.uri for track in self._pages.get(name) or []]
+
+    def _index(self, paths):
+        """Fetch and index the first page of every path, by name"""
+        names = list(paths)
+        results = self.client.get_many([
+            '%s?limit=%d' % (paths[name], self.size) for name in names],
+            self.parse_page)
+        pages = {}
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.warn('Failed to index Mixcloud %s: %s', name, result)
+                continue
+            pages[name] = result
+            if self.client.store:
+                self.client.store_feed(
+                    self.uri(name), {'data': result, 'next': None})
+        now = time.time()
+        with self._lock:
+            self._pages.update(pages)
+            self._fetched.update((name, now) for name in pages)
+        return pages
+
+    def _load(self):
+        store = self.client.store
+        entry = store.get_feed(EXPLORE_URI) if store else None
+        if entry is None:
+            return
+        self._categories = [tuple(category) for category in entry.value]
+        for name in [slug for slug, _ in self._categories] + [HOT]:
+            page = store.get_feed(self.uri(name))
+            if page is not None:
+                self._pages[name] = self.client.remember(page.value['data'])
+                self._fetched[name] = page.fetched
+
+    def _save(self, key, value):
+        store = self.client.store
+        if store:
+            store.put_feed(key, value)
@@ -0,0 +1,57 @@
+from __future__ import unicode_literals
+
+import logging
+
+from mopidy import core
+
+import pykka
+
+from .actor import MixcloudBackend
+
+
+logger = logging.getLogger(__name__)
+
+# tracklist entries looked at for upcoming Mixcloud tracks
+MAX_LOOKAHEAD = 50
+
+
+class MixcloudPrefetchFrontend(pykka.ThreadingActor, core.CoreListener):
+    """Tell the backend which Mixcloud tracks are coming up next."""
+
+    def __init__(self, config, core):
+        super(MixcloudPrefetchFrontend, self).__init__()
+        self.core = core
+        self.depth = config['mixcloud'].get('prefetch_depth', 2)
+
+    def upcoming_uris(self):
+        """Uris of the next ``prefetch_depth`` Mixcloud tracks to be played,
+        following the tracklist's repeat, single and random modes, among
+        the next ``MAX_LOOKAHEAD`` tracks"""
+        tracklist = self.core.tracklist
+        tl_track = self.core.playback.get_current_tl_track().get()
+        seen = set()
+        uris = []
+        while len(uris) < self.depth and len(seen) < MAX_LOOKAHEAD:
+            tl_track = tracklist.eot_track(tl_track).get()
+            if tl_track is None or tl_track.tlid in seen:
+                break
+            seen.add(tl_track.tlid)
+            if tl_track.track.uri.startswith('mixcloud:'):
+                uris.append(tl_track.track.uri)
+        return uris
+
+    def prefetch(self):
+        if not self.depth:
+            return
+        backends = pykka.ActorRegistry.get_by_class(MixcloudBackend)
+        if not backends:
+            return
+        uris = self.upcoming_uris()
+        logger.debug('Prefetching %d upcoming Mixcloud tracks', len(uris))
+        backends[0].proxy().prefetch(uris)
+
+    def track_playback_started(self, tl_track):
+        self.prefetch()
+
+    def tracklist_changed(self):
+        self.prefetch()
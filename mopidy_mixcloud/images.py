@@ -0,0 +1,168 @@
+from __future__ import unicode_literals
+
+import collections
+import hashlib
+import logging
+import os
+import re
+import threading
+
+from mopidy.models import Image
+
+
+logger = logging.getLogger(__name__)
+
+THUMBNAILER = 'https://thumbnailer.mixcloud.com/unsafe/'
+# where the thumbnail cache is served by Mopidy-HTTP
+PROXY_PATH = '/mixcloud/images/'
+THUMBNAIL_RE = re.compile(
+    r'^https?://thumbnailer\.mixcloud\.com/unsafe/\d+x\d+/([\w./%-]+)$')
+
+# picture sizes of the API, largest first, used for non-thumbnailer urls
+PICTURE_SIZES = [
+    ('extra_large', 600), ('large', 300), ('medium', 100),
+    ('thumbnail', 50), ('small', 25)]
+
+
+def picture_source(pictures):
+    """Reduce the ``pictures`` of a cloudcast or user to what images of
+    any size can be built from
+
+    :return: the thumbnailer path of the picture, a ``(url, size)`` tuple
+        of the largest picture, or ``None``
+    """
+    if not pictures:
+        return None
+    for name, size in PICTURE_SIZES:
+        url = pictures.get(name)
+        if url:
+            match = THUMBNAIL_RE.match(url)
+            if match:
+                return match.group(1)
+            return url, size
+    return None
+
+
+def image_sizes(config):
+    return sorted(int(size) for size in
+                  config.get('image_sizes') or (100, 300, 600))
+
+
+class ImageIndex(object):
+    """Images of parsed cloudcasts and users, by uri.
+
+    Images of any configured size are derived from the single thumbnailer
+    path the record store keeps per cloudcast and user, so
+    :meth:`get_images` needs no requests. With a ``proxy`` prefix the image
+    uris point at the extension's thumbnail cache instead of the Mixcloud
+    CDN.
+
+    :param records: :class:`RecordStore` holding the picture sources
+    :param sizes: square sizes in pixels offered per image
+    :param proxy: url prefix of the thumbnail cache, or ``None``
+    """
+
+    def __init__(self, records, sizes=(100, 300, 600), proxy=None):
+        self.records = records
+        self.sizes = sorted(sizes)
+        self.proxy = proxy
+
+    def images(self, uri):
+        source = self.records.picture(uri)
+        if source is None:
+            return []
+        if isinstance(source, tuple):
+            url, size = source
+            return [Image(uri=url, width=size, height=size)]
+        prefix = self.proxy or THUMBNAILER
+        return [Image(uri='%s%dx%d/%s' % (prefix, size, size, source),
+                      width=size, height=size)
+                for size in self.sizes]
+
+    def get_images(self, uris):
+        """Images of many uris at once
+
+        :return: dict mapping every uri to a list of `Image`, largest last
+        """
+        return dict((uri, self.images(uri)) for uri in uris)
+
+
+class ThumbnailCache(object):
+    """Thumbnails kept on disk, the least recently used are deleted once
+    they take more than ``max_bytes``. Each file starts with a line holding
+    the content type of the thumbnail.
+
+    :param path: directory holding the files
+    :param max_bytes: size cap of the directory
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._files = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        entries = []
+        for name in os.listdir(path):
+            if name.endswith('.tmp'):
+                continue
+            stat = os.stat(os.path.join(path, name))
+            entries.append((stat.st_atime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self.size += size
+
+    def filename(self, key):
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached bytes and content type of ``key`` or
+        ``None``"""
+        name = self.filename(key)
+        with self._lock:
+            size = self._files.pop(name, None)
+            if size is None:
+                return None
+            self._files[name] = size
+        try:
+            with open(os.path.join(self.path, name), 'rb') as fh:
+                content_type = fh.readline().strip()
+                data = fh.read()
+        except IOError:
+            content_type = None
+        if not content_type:
+            with self._lock:
+                if self._files.pop(name, None) is not None:
+                    self.size -= size
+            return None
+        return data, content_type.decode('ascii')
+
+    def put(self, key, data, content_type):
+        name = self.filename(key)
+        tmp = os.path.join(self.path, name + '.tmp')
+        header = content_type.encode('ascii') + b'\n'
+        with open(tmp, 'wb') as fh:
+            fh.write(header)
+            fh.write(data)
+        os.rename(tmp, os.path.join(self.path, name))
+        size = len(header) + len(data)
+        removed = []
+        with self._lock:
+            self.size += size - self._files.pop(name, 0)
+            self._files[name] = size
+            while self.size > self.max_bytes and len(self._files) > 1:
+                oldest, size = self._files.popitem(last=False)
+                self.size -= size
+                removed.append(oldest)
+        for oldest in removed:
+            try:
+                os.remove(os.path.join(self.path, oldest))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {'files': len(self._files), 'bytes': self.size,
+                    'max_bytes': self.max_bytes}
@@ -2,27 +2,52 @@ from __future__ import unicode_literals
 
 import collections
 import logging
-import re
 import urllib
 from urlparse import urlparse
 
 from mopidy import backend, models
 from mopidy.models import SearchResult, Track
 
-from mopidy_mixcloud.mixcloud import safe_url
+from mopidy_mixcloud.cache import LRUCache
+from mopidy_mixcloud.explore import HOT
+from mopidy_mixcloud.metrics import timed
 
 
 logger = logging.getLogger(__name__)
 
+DIRECTORY_PREFIX = 'mixcloud:directory:'
 
-def generate_uri(path):
-    return 'mixcloud:directory:%s' % urllib.quote('/'.join(path))
+# Folders of a user: name, node kind, API section and listing TTL in seconds
+USER_FOLDERS = [
+    ('Favorites', 'cloudcasts', 'favorites', 300),
+    ('Listen Later', 'cloudcasts', 'listen-later', 300),
+    ('Uploads', 'cloudcasts', 'cloudcasts', 3600),
+    ('Following', 'users', 'following', 3600),
+    ('Playlists', 'playlists', 'playlists', 3600),
+]
+LISTING_TTLS = dict((section, ttl) for _, _, section, ttl in USER_FOLDERS)
 
 
-def new_folder(name, path):
+def generate_uri(path, offset=0):
+    """Directory uri of ``path``, pages after the first are marked with an
+    ``@<offset>`` suffix which quoting keeps out of the path itself"""
+    uri = DIRECTORY_PREFIX + urllib.quote('/'.join(path).encode('utf-8'))
+    if offset:
+        uri += '@%d' % offset
+    return uri
+
+
+def parse_uri(uri):
+    """Split a directory uri into node kind, API path and page offset"""
+    path, _, offset = uri[len(DIRECTORY_PREFIX):].partition('@')
+    path = urllib.unquote(path.encode('utf-8')).decode('utf-8').split('/')
+    return path[0], '/'.join(path[1:]), int(offset or 0)
+
+
+def new_folder(name, path, offset=0):
     return models.Ref.directory(
-        uri=generate_uri(path),
-        name=safe_url(name)
+        uri=generate_uri(path, offset),
+        name=name
     )
 
 
@@ -52,37 +77,214 @@ class MixcloudLibraryProvider(backend.LibraryProvider):
         super(MixcloudLibraryProvider, self).__init__(*args, **kwargs)
         self.vfs = {'mixcloud:directory': collections.OrderedDict()}
         self.add_to_vfs(new_folder('Feed', ['feed']))
+        username = self.backend.remote.username
+        for folder in USER_FOLDERS if username else []:
+            self.add_to_vfs(self.user_folder(username, *folder))
+        self.favorites_uri = generate_uri(
+            ['cloudcasts', '%s/favorites' % username])
+        self.add_to_vfs(new_folder('Hot', ['explore', HOT]))
+        self.add_to_vfs(new_folder('Categories', ['explore']))
+        self.listers = {
+            'feed': self.list_feed,
+            'cloudcasts': self.list_cloudcasts,
+            'users': self.list_users,
+            'playlists': self.list_playlists,
+            'user': self.list_user,
+            'explore': self.list_explore,
+        }
+        self._listings = LRUCache(
+            maxsize=self.backend.remote.cache_size,
+            ttl=self.backend.remote.cache_ttl)
+        self.metrics = self.backend.remote.metrics
+        self.metrics.register('listings', self._listings.stats)
 
+    def add_to_vfs(self, _model, parent='mixcloud:directory'):
+        self.vfs.setdefault(parent, collections.OrderedDict())
+        self.vfs[parent][_model.uri] = _model
 
-    def add_to_vfs(self, _model):
-        self.vfs['mixcloud:directory'][_model.uri] = _model
+    def user_folder(self, username, name, kind, section, ttl=None):
+        return new_folder(name, [kind, username + '/' + section])
 
-    def list_feed(self):
-        logger.debug('loading feed')
+    def list_user(self, username, offset=0):
+        return [self.user_folder(username, *folder)
+                for folder in USER_FOLDERS if folder[2] != 'listen-later']
+
+    def list_feed(self, path='', offset=0):
+        logger.debug('loading feed from %d', offset)
+        remote = self.backend.remote
+        # pages the snapshot does not hold yet are fetched directly while
+        # the first sync fills it in the background
+        records = remote.feed.snapshot()
+        remote.feed.sync_if_stale()
+        remote.scheduler.used('feed', remote.feed.synced)
+        if offset < len(records):
+            end = offset + remote.feed_page_size
+            page = {
+                'data': records[offset:end],
+                'next': end < len(records) or remote.feed.more,
+            }
+        else:
+            page = remote.get_user_stream(offset)
         feed = []
-        for cast in self.backend.remote.get_user_stream():
-            logger.debug('found feed track', cast.get(u'key'))
-            feed.append(models.Ref.track(uri="mixcloud:"+cast.get(u'key'), name=cast.get(u'title')))
-        return feed
+        for record in page['data']:
+            logger.debug('found feed track %s', record.uri)
+            feed.append(remote.records.ref(record))
+        return feed + self.more(page, ['feed'], offset)
+
+    def list_explore(self, path='', offset=0):
+        """List the categories, or the indexed cloudcasts of one"""
+        remote = self.backend.remote
+        if not path:
+            return [new_folder(name, ['explore', slug])
+                    for slug, name in remote.explore.categories()]
+        return [remote.records.ref(record)
+                for record in remote.explore.cloudcasts(path)]
+
+    def more(self, page, path, offset):
+        remote = self.backend.remote
+        next_offset = offset + remote.feed_page_size
+        if page['next'] and next_offset < remote.feed_page_size * remote.feed_max_pages:
+            return [new_folder('More...', path, next_offset)]
+        return []
 
+    def list_page(self, kind, path, offset, parse, to_ref=None):
+        """List a page of an API list, its items parsed by ``parse`` and
+        turned into `Ref` by ``to_ref`` if they are not already"""
+        remote = self.backend.remote
+        items = remote.paged(path + '/', parse)
+        end = offset + remote.feed_page_size
+        page = {'data': items[offset:end], 'next': items.has_more(end)}
+        refs = [to_ref(item) for item in page['data']] if to_ref \
+            else page['data']
+        return refs + self.more(page, [kind, path], offset)
 
+    def list_cloudcasts(self, path, offset=0):
+        remote = self.backend.remote
+        return self.list_page('cloudcasts', path, offset,
+                              remote.parser.parse_record, remote.records.ref)
 
+    def list_users(self, path, offset=0):
+        return self.list_page('users', path, offset, self.user_ref)
+
+    def list_playlists(self, path, offset=0):
+        return self.list_page('playlists', path, offset, self.playlist_ref)
+
+    def user_ref(self, user):
+        if not user.get('username'):
+            return None
+        return models.Ref.directory(
+            uri=generate_uri(['user', user['username']]),
+            name=user.get('name') or user['username'])
+
+    def playlist_ref(self, playlist):
+        if not playlist.get('key'):
+            return None
+        return models.Ref.directory(
+            uri=generate_uri(
+                ['cloudcasts', playlist['key'].strip('/') + '/cloudcasts']),
+            name=playlist.get('name'))
+
+    @timed('browse')
     def browse(self, uri):
-        logger.debug('Browse', uri)
-        if not self.vfs.get(uri):
-            (req_type, res_id) = re.match(r'.*:(\w*)(?:/(\d*))?', uri).groups()
-            # Sets
-            if 'feed' == req_type:
-                return self.list_feed()
+        logger.debug('Browse %s', uri)
+        if uri in self.vfs:
+            # static directory
+            return self.vfs[uri].values()
+        if not uri.startswith(DIRECTORY_PREFIX):
+            return []
+        kind, path, offset = parse_uri(uri)
+        lister = self.listers.get(kind)
+        if lister is None:
+            return []
+        if kind in ('feed', 'explore'):
+            # served from local indexes kept current in the background
+            try:
+                return lister(path, offset)
+            except Exception as e:
+                logger.warn('Failed to browse %s: %s', uri, e)
+                return []
+        refs, fresh = self._listings.get_stale(uri)
+        if refs is None:
+            try:
+                refs = self.load_listing(uri)
+            except Exception as e:
+                logger.warn('Failed to browse %s: %s', uri, e)
+                return []
+        elif not fresh:
+            self.backend.remote.revalidate(uri, self.refresh_listing, uri)
+        if uri == self.favorites_uri:
+            self.backend.remote.scheduler.used('favorites')
+        return refs
 
-        # root directory
-        return self.vfs.get(uri, {}).values()
+    def refresh_listing(self, uri):
+        """Fetch a directory listing again and replace the cached one"""
+        self.backend.remote.lists.invalidate(parse_uri(uri)[1] + '/')
+        return self.load_listing(uri)
 
-    def lookup(self, uri):
-        if 'mixcloud:' in uri:
+    def load_listing(self, uri):
+        kind, path, offset = parse_uri(uri)
+        refs = self.listers[kind](path, offset)
+        self._listings.set(uri, refs, ttl=LISTING_TTLS.get(
+            path.split('/')[-1], self._listings.ttl))
+        return refs
+
+    def refresh(self, uri=None):
+        if uri is None or uri.startswith('mixcloud:directory:feed'):
+            self.backend.remote.feed.sync_later()
+        if uri is None:
+            self._listings.clear()
+            self.backend.remote.lists.clear()
+        else:
+            self._listings.invalidate(uri)
+            if uri.startswith(DIRECTORY_PREFIX):
+                self.backend.remote.lists.invalidate(parse_uri(uri)[1] + '/')
 
+    def search(self, query=None, uris=None, exact=False):
+        query = simplify_search_query(query)
+        if not query or uris and not any(
+                uri.startswith('mixcloud:') for uri in uris):
+            return SearchResult(uri='mixcloud:search')
+        logger.debug('Searching Mixcloud for %s', query)
+        return SearchResult(
+            uri='mixcloud:search',
+            tracks=self.backend.remote.search_local(query, exact))
+
+    @timed('lookup')
+    def lookup(self, uri):
+        # Mopidy core looks uris up one by one, folders are looked up from
+        # their list pages in bulk
+        if uri.startswith(DIRECTORY_PREFIX):
+            return self.lookup_directory(uri)
+        if 'mixcloud:' not in uri:
+            return []
+        try:
+            track = self.backend.remote.resolve_url(
+                uri.replace('mixcloud:', ''))
+        except Exception as e:
+            logger.warn('Failed to look up %s: %s', uri, e)
+            return []
+        return [track] if track else []
 
-            uri = uri.replace('mixcloud:', '')
-            return [self.backend.remote.resolve_url(uri)]
+    def get_images(self, uris):
+        return self.backend.remote.images.get_images(uris)
 
+    def lookup_directory(self, uri):
+        """All tracks of a directory, built from its list pages"""
+        remote = self.backend.remote
+        kind, path, offset = parse_uri(uri)
+        try:
+            if kind == 'cloudcasts':
+                return remote.list_tracks(path + '/')
+            if kind == 'user':
+                return remote.list_tracks(path + '/cloudcasts/')
+            if kind == 'explore' and path:
+                return [remote.records.track(record)
+                        for record in remote.explore.cloudcasts(path)]
+            if kind == 'feed':
+                if not remote.feed.snapshot():
+                    remote.feed.sync()
+                return [remote.records.track(record)
+                        for record in remote.feed.snapshot()]
+        except Exception as e:
+            logger.warn('Failed to look up %s: %s', uri, e)
         return []
@@ -0,0 +1,241 @@
+from __future__ import unicode_literals
+
+import functools
+import logging
+import os
+import re
+import socket
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class Timer(object):
+
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class _Timing(object):
+
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.time() - self.start)
+
+
+class _NullTiming(object):
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_TIMING = _NullTiming()
+
+
+class NullMetrics(object):
+    """Metrics that record nothing, used when metrics are disabled."""
+
+    enabled = False
+
+    def incr(self, name, value=1):
+        pass
+
+    def observe(self, name, seconds):
+        pass
+
+    def timer(self, name):
+        return NULL_TIMING
+
+    def register(self, name, func):
+        pass
+
+    def snapshot(self):
+        return {}
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class Metrics(NullMetrics):
+    """Counters, timers and gauges of the backend.
+
+    Gauges are callables registered with :meth:`register` returning a dict
+    of numbers, e.g. the ``stats()`` of a cache. :meth:`snapshot` collects
+    everything into one flat dict which a sink can export every
+    ``interval`` seconds.
+
+    :param sink: object with a ``write(snapshot)`` method, or ``None``
+    """
+
+    enabled = True
+
+    def __init__(self, sink=None, interval=60):
+        self.sink = sink
+        self.interval = interval
+        self._counters = {}
+        self._timers = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = Timer()
+            timer.add(seconds)
+
+    def timer(self, name):
+        return _Timing(self, name)
+
+    def register(self, name, func):
+        self._gauges[name] = func
+
+    def snapshot(self):
+        with self._lock:
+            values = dict(self._counters)
+            for name, timer in self._timers.items():
+                values[name + '.count'] = timer.count
+                values[name + '.seconds_total'] = timer.total
+                values[name + '.seconds_max'] = timer.max
+        for name, func in self._gauges.items():
+            try:
+                stats = func()
+            except Exception as e:
+                logger.debug('Collecting %s metrics failed: %s', name, e)
+                continue
+            for key, value in stats.items():
+                if isinstance(value, (int, long, float)):
+                    values['%s.%s' % (name, key)] = value
+            hits, misses = stats.get('hits'), stats.get('misses')
+            if hits is not None and misses is not None:
+                values[name + '.hit_ratio'] = (
+                    float(hits) / (hits + misses) if hits + misses else 0.0)
+        return values
+
+    def start(self):
+        if self.sink is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name='MixcloudMetrics')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self.sink is not None:
+            self.flush()
+
+    def flush(self):
+        try:
+            self.sink.write(self.snapshot())
+        except Exception as e:
+            logger.warn('Exporting Mixcloud metrics failed: %s', e)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+
+class PrometheusSink(object):
+    """Write the snapshot in Prometheus text format, for the node exporter
+    textfile collector"""
+
+    def __init__(self, path, prefix='mopidy_mixcloud'):
+        self.path = path
+        self.prefix = prefix
+
+    def write(self, snapshot):
+        lines = []
+        for name in sorted(snapshot):
+            metric = re.sub(r'[^a-zA-Z0-9_]', '_', '%s_%s' % (
+                self.prefix, name))
+            lines.append('%s %r' % (metric, float(snapshot[name])))
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as fh:
+            fh.write('\n'.join(lines) + '\n')
+        os.rename(tmp, self.path)
+
+
+class StatsdSink(object):
+    """Send the snapshot as StatsD gauges over UDP"""
+
+    def __init__(self, address, prefix='mopidy.mixcloud'):
+        host, _, port = address.partition(':')
+        self.address = (host or 'localhost', int(port or 8125))
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def write(self, snapshot):
+        lines = ['%s.%s:%s|g' % (self.prefix, name, value)
+                 for name, value in sorted(snapshot.items())]
+        # keep datagrams below common MTUs
+        packet = []
+        for line in lines:
+            if packet and sum(len(l) + 1 for l in packet) + len(line) > 1400:
+                self._socket.sendto('\n'.join(packet).encode('utf-8'),
+                                    self.address)
+                packet = []
+            packet.append(line)
+        if packet:
+            self._socket.sendto('\n'.join(packet).encode('utf-8'),
+                                self.address)
+
+
+def create_metrics(config):
+    kind = config.get('metrics') or 'off'
+    if kind == 'off':
+        return NullMetrics()
+    target = config.get('metrics_target')
+    interval = config.get('metrics_interval', 60)
+    sink = None
+    if kind == 'prometheus':
+        sink = PrometheusSink(target or 'mopidy_mixcloud.prom')
+    elif kind == 'statsd':
+        sink = StatsdSink(target or 'localhost:8125')
+    return Metrics(sink, interval)
+
+
+def timed(name):
+    """Time a method in the ``metrics`` of its instance"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,23 +1,33 @@
 from __future__ import unicode_literals
 
 import collections
+import functools
+import itertools
 import logging
 import re
 import string
+import threading
 import time
 import unicodedata
-from multiprocessing.pool import ThreadPool
 from urllib import quote_plus
 
-from mopidy.models import Album, Artist, Track
+from .cache import LRUCache, cache
+from .decoder import PlayInfoDecoder, find_play_info
+from .engine import create_engine
+from .explore import CategoryIndex
+from .images import PROXY_PATH, ImageIndex, image_sizes
+from .metrics import create_metrics, timed
+from .paging import PagedList
+from .parser import CloudcastParser
+from .records import RecordStore
+from .scheduler import RefreshScheduler
+from .search import SearchIndex
+from .sync import FeedSync
+from .throttle import (
+    CircuitBreaker, CircuitOpenError, SingleFlight, TokenBucket, backoff_delay,
+    parse_retry_after)
 
 
-
-import requests
-import base64
-import json
-from itertools import  cycle
-
 logger = logging.getLogger(__name__)
 
 
@@ -33,100 +43,6 @@ def readable_url(uri):
                   ''.join(c for c in safe_uri if c in valid_chars)).strip()
 
 
-class cache(object):
-    # TODO: merge this to util library
-
-    def __init__(self, ctl=8, ttl=3600):
-        self.cache = {}
-        self.ctl = ctl
-        self.ttl = ttl
-        self._call_count = 1
-
-    def __call__(self, func):
-        def _memoized(*args):
-            self.func = func
-            now = time.time()
-            try:
-                value, last_update = self.cache[args]
-                age = now - last_update
-                if self._call_count >= self.ctl or age > self.ttl:
-                    self._call_count = 1
-                    raise AttributeError
-
-                self._call_count += 1
-                return value
-
-            except (KeyError, AttributeError):
-                value = self.func(*args)
-                self.cache[args] = (value, now)
-                return value
-
-            except TypeError:
-                return self.func(*args)
-
-        return _memoized
-
-def add_cloudcast(index, json):
-    logger.debug( 'add_cloudcast %s', ','.join(json.keys()) )
-    if STR_NAME not in json or not json[STR_NAME]:
-        logger.warn('name not found in track %s', index)
-        return {}
-    json_name=json[STR_NAME]
-    logger.debug('parsing track %s', json_name)
-    json_key=''
-    json_year=0
-    json_date=''
-    json_length=0
-    json_userkey=''
-    json_username=''
-    json_image=''
-    json_comment=''
-    json_genre=''
-    if STR_KEY in json and json[STR_KEY]:
-        json_key=json[STR_KEY]
-        logger.debug('Key is %s', json_key)
-    if STR_CREATEDTIME in json and json[STR_CREATEDTIME]:
-        json_created=json[STR_CREATEDTIME]
-        json_structtime=time.strptime(json_created[0:10],'%Y-%m-%d')
-        json_year=int(time.strftime('%Y',json_structtime))
-        json_date=time.strftime('%d/%m/Y',json_structtime)
-    if STR_AUDIOLENGTH in json and json[STR_AUDIOLENGTH]:
-        json_length=json[STR_AUDIOLENGTH]
-    if STR_USER in json and json[STR_USER]:
-        json_user=json[STR_USER]
-        if STR_KEY in json_user and json_user[STR_KEY]:
-            json_userkey=json_user[STR_KEY]
-        if STR_NAME in json_user and json_user[STR_NAME]:
-            json_username=json_user[STR_NAME]
-    if STR_PICTURES in json and json[STR_PICTURES]:
-        json_pictures=json[STR_PICTURES]
-        if thumb_size in json_pictures and json_pictures[thumb_size]:
-            json_image=json_pictures[thumb_size]
-    if STR_DESCRIPTION in json and json[STR_DESCRIPTION]:
-        json_comment=json[STR_DESCRIPTION].encode('ascii', 'ignore')
-    if STR_TAGS in json and json[STR_TAGS]:
-        json_tags=json[STR_TAGS]
-        for json_tag in json_tags:
-            if STR_NAME in json_tag and json_tag[STR_NAME]:
-                if json_genre<>'':
-                    json_genre += ', '
-                json_genre=json_genre+json_tag[STR_NAME]
-    infolabels = {
-        STR_COUNT:index,
-        STR_TRACKNUMBER:index,
-        STR_TITLE:json_name,
-        STR_ARTIST:json_username,
-        STR_DURATION:json_length,
-        STR_YEAR:json_year,
-        STR_DATE:json_date,
-        STR_COMMENT:json_comment,
-        STR_GENRE:json_genre,
-        STR_KEY:json_key
-    }
-
-    return infolabels
-
-
 STR_ACCESS_TOKEN=u'access_token'
 STR_ARTIST=      u'artist'
 STR_AUDIOFORMATS=u'audio_formats'
@@ -175,7 +91,7 @@ STR_THUMB_SIZES= {0:u'small',1:u'thumbnail',2:u'medium',3:u'large',4:u'extra_lar
 
 URL_PLUGIN=         'plugin://music/MixCloud/'
 URL_MIXCLOUD=       'http://www.mixcloud.com/'
-URL_API=            'http://api.mixcloud.com/'
+URL_API=            'https://api.mixcloud.com/'
 URL_CATEGORIES=     'http://api.mixcloud.com/categories/'
 URL_HOT=            'http://api.mixcloud.com/popular/hot/'
 URL_SEARCH=         'http://api.mixcloud.com/search/'
@@ -194,195 +110,352 @@ URL_FOLLOW=         'https://api.mixcloud.com{0}/follow/'
 URL_ADDLISTENLATER= 'https://api.mixcloud.com{0}listen-later/'
 URL_TOKEN=          'https://www.mixcloud.com/oauth/access_token'
 
-ext_info = False
 thumb_size = STR_THUMB_SIZES[0]
 
-def get_cloudcast(url,parameters,index=1,total=0,forinfo=False):
-    logger.debug('Get cloudcast '+url)
-    try:
-        h=requests.get(url, params=parameters)
-        logger.debug('Get cloudcast '+h.url)
-        json_cloudcast=h.json()
-        return add_cloudcast(index, json_cloudcast)
-    except Exception as e:
-        logger.error('Get cloudcast failed error=%s' % e)
-    return {}
-
-
-def get_cloudcasts(url,parameters={}):
-    found=0
-
-    logger.debug('Get cloudcasts '+url)
-    h=requests.get(url, params=parameters)
-    logger.debug('Get cloudcasts '+h.url)
-    json_content=h.json()
-    if STR_DATA in json_content and json_content[STR_DATA] :
-        json_data=json_content[STR_DATA]
-        total=len(json_data)+1
-        json_tracknumber=0
-        if STR_OFFSET in parameters:
-            json_tracknumber=parameters[STR_OFFSET]
-        else:
-            json_tracknumber=0
-
-        for json_cloudcast in json_data:
-            json_tracknumber=json_tracknumber+1
-            if ext_info:
-                infolabels = get_cloudcast(URL_API[:-1]+json_cloudcast[STR_KEY],{},json_tracknumber,total)
-            else:
-                infolabels = add_cloudcast(json_tracknumber, json_cloudcast)
-            if len(infolabels)>0:
-                found=found+1
-    return found
+
+def api_url(path):
+    return URL_API + path.lstrip('/')
+
+
+def build_session(config, pool_size=10):
+    """Create a `requests.Session` with a connection pool sized for the
+    worker threads
+
+    Retries are left to :meth:`MixcloudClient._request`, which backs off
+    with jitter and feeds the circuit breakers.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=config.get('http_pool_size') or pool_size)
+    session = requests.Session()
+    session.headers['Connection'] = 'keep-alive'
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
 
 class MixcloudClient(object):
 
-    def __init__(self, config):
+    def __init__(self, config, store=None, metrics=None):
         super(MixcloudClient, self).__init__()
-        self.http_client = requests.Session()
-
+        self.config = config
+        self.metrics = metrics or create_metrics(config)
+        self.cache_size = config.get('cache_size', 1024)
+        self.cache_ttl = config.get('cache_ttl', 3600)
+        self.feed_page_size = config.get('feed_page_size', 20)
+        self.feed_max_pages = config.get('feed_max_pages', 50)
+        self.lookup_workers = config.get('lookup_workers', 8)
+        self.list_page_size = config.get('list_page_size', 50)
+        self.list_window = config.get('list_window', 4)
+        self.lookup_max_tracks = config.get('lookup_max_tracks', 1000)
+        self.lists = LRUCache(maxsize=16, ttl=self.cache_ttl)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._http_client = None
+        self._http_lock = threading.Lock()
+        self._engine = None
+        self._engine_lock = threading.Lock()
+        self.http_retries = config.get('http_retries', 2)
+        self.http_backoff = config.get('http_backoff', 500) / 1000.0
+        connect = config.get('http_connect_timeout', 3000) / 1000.0
+        # (connect, read) timeouts in seconds of each kind of endpoint
+        self.timeouts = {
+            'api': (connect, config.get('http_read_timeout', 10000) / 1000.0),
+            'page': (connect,
+                     config.get('page_read_timeout', 20000) / 1000.0),
+        }
+        self.breakers = dict(
+            (endpoint, CircuitBreaker(config.get('circuit_threshold', 5),
+                                      config.get('circuit_reset', 30)))
+            for endpoint in self.timeouts)
+        self.limiter = TokenBucket(
+            config.get('rate_limit', 10), config.get('rate_burst', 20))
+        self.inflight = SingleFlight()
+        self.responses = LRUCache(
+            maxsize=config.get('http_cache_size', 256), ttl=0)
+        self._page_parsers = {}
+        self.not_modified = 0
+        self._not_modified_lock = threading.Lock()
+        self.username = config.get('username')
+        self.explore_songs = config.get('explore_songs', 25)
+        self.search_min_length = config.get('search_min_length', 3)
+        self.search_debounce = config.get('search_debounce', 500) / 1000.0
+        self._search_timer = None
+        self._search_lock = threading.Lock()
+        self.records = RecordStore(config.get('record_store_size', 100000))
+        self.index = SearchIndex(config.get('search_index_size', 20000))
+        self.images = ImageIndex(
+            self.records, image_sizes(config),
+            PROXY_PATH if config.get('thumbnail_cache_size') else None)
+        self.parser = CloudcastParser(self.records, self.index)
+        self.play_info_decoder = PlayInfoDecoder()
+        self.store = store
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+        self.scheduler = RefreshScheduler(
+            jitter=config.get('refresh_jitter', 10) / 100.0)
+        self.feed = FeedSync(self, config.get('feed_snapshot_size', 500))
+        self.explore = CategoryIndex(self, self.explore_songs)
+        self.metrics.register('limiter', self.limiter.stats)
+        self.metrics.register('coalescing', self.inflight.stats)
+        self.metrics.register('responses', lambda: dict(
+            self.responses.stats(), not_modified=self.not_modified))
+        self.metrics.register(
+            'tracks', lambda: type(self).resolve_url.cache_for(self).stats())
+        self.metrics.register('records', self.records.stats)
+        for endpoint, breaker in self.breakers.items():
+            self.metrics.register('circuit.' + endpoint, breaker.stats)
+
+    def get_user_stream(self, offset=0, limit=None):
+        """Fetch one page of the user feed
+
+        :param offset: number of feed items to skip
+        :param limit: page size, defaults to ``feed_page_size``
+        :return: dict with the page ``data`` as :class:`Cloudcast` records
+            and the ``next`` page url
+        """
+        logger.debug("Get user stream from %d" % offset)
+        return self._get_feed_page(self.feed_url(offset, limit))
 
-    @property
-    @cache()
-    def user(self):
-        return self._get('me.json')
+    def feed_url(self, offset=0, limit=None):
+        return '%s%s/feed/?limit=%d&offset=%d' % (
+            URL_API, self.username, limit or self.feed_page_size, offset)
 
-    #@cache()
-    def get_user_stream(self):
-        logger.debug("Get user stream")
-        result = self.http_client.get(URL_FEED).json()
-        logger.debug(result[u'data'][0].keys())
-        return self.sanitize_tracks([add_cloudcast(0, track[u'cloudcasts'][0]) for track in result[u'data']])
+    def get_page(self, path, offset=0, limit=None, parse=None):
+        """Fetch one page of an API list such as ``<user>/favorites/``
 
-    @cache()
-    def get_explore_categories(self):
-        return self._get('explore/categories', 'api-v2').get('music')
-
-    def get_explore(self, query_explore_id=None):
-        explore = self.get_explore_categories()
-        if query_explore_id:
-            url = 'explore/{urn}?limit={limit}&offset=0&linked_partitioning=1'\
-                .format(
-                    urn=explore[int(query_explore_id)],
-                    limit=self.explore_songs
-                )
-            web_tracks = self._get(url, 'api-v2')
-            track_ids = map(lambda x: x.get('id'), web_tracks.get('tracks'))
-            return self.resolve_tracks(track_ids)
-        return explore
-
-    def get_groups(self, query_group_id=None):
-
-        if query_group_id:
-            web_tracks = self._get(
-                'groups/%d/tracks.json' % int(query_group_id))
-            tracks = []
-            for track in web_tracks:
-                if 'track' in track.get('kind'):
-                    tracks.append(self.parse_track(track))
-            return self.sanitize_tracks(tracks)
-        else:
-            return self._get('me/groups.json')
+        :param parse: optional callable mapping an item to its parsed value,
+            or ``None`` if it is unusable
+        :return: dict with the page ``data`` and the ``next`` page url
+        """
+        return self._get('%s?limit=%d&offset=%d' % (
+            path, limit or self.feed_page_size, offset),
+            self.page_parser(parse))
 
-    def get_followings(self, query_user_id=None):
+    def get_pages(self, path, ranges, parse=None):
+        """Fetch several pages of an API list concurrently through the I/O
+        engine
 
-        if query_user_id:
-            return self._get('users/%s/tracks.json' % query_user_id)
+        :param ranges: list of ``(offset, limit)``
+        :return: list of pages as from :meth:`get_page`, or the exception
+            raised for a page
+        """
+        return self.get_many(['%s?limit=%d&offset=%d' % (
+            path, limit, offset) for offset, limit in ranges],
+            self.page_parser(parse))
 
-        users = []
-        for playlist in self._get('me/followings.json?limit=60'):
-            name = playlist.get('username')
-            user_id = str(playlist.get('id'))
-            logger.debug('Fetched user %s with id %s' % (
-                name, user_id
-            ))
+    def page_parser(self, parse=None):
+        """Callable turning an API list response into a page of items
+        parsed by ``parse``
 
-            users.append((name, user_id))
-        return users
+        The same callable is returned for the same ``parse``, so the page
+        kept with a response is reused when the response was not modified.
+        """
+        parser = self._page_parsers.get(parse)
+        if parser is None:
+            parser = self._page_parsers.setdefault(
+                parse, functools.partial(self._page, parse=parse))
+        return parser
+
+    def _page(self, result, parse=None):
+        data = result.get(STR_DATA, [])
+        return {
+            'data': [parse(item) for item in data] if parse else data,
+            'next': result.get(u'paging', {}).get(u'next'),
+        }
 
-    @cache()
-    def get_set(self, set_id):
-        playlist = self._get('playlists/%s.json' % set_id)
-        return playlist.get('tracks', [])
-
-    def get_sets(self):
-        playable_sets = []
-        for playlist in self._get('me/playlists.json?limit=1000'):
-            name = playlist.get('title')
-            set_id = str(playlist.get('id'))
-            tracks = playlist.get('tracks')
-            logger.debug('Fetched set %s with id %s (%d tracks)' % (
-                name, set_id, len(tracks)
-            ))
-            playable_sets.append((name, set_id, tracks))
-        return playable_sets
-
-    def get_user_liked(self):
-        # Note: As with get_user_stream, this API call is undocumented.
-        likes = []
-        liked = self._get('e1/me/likes.json?limit=1000')
-        for data in liked:
-
-            track = data['track']
-            if track:
-                likes.append(self.parse_track(track))
-
-            pl = data['playlist']
-            if pl:
-                likes.append((pl['title'], str(pl['id'])))
-
-        return self.sanitize_tracks(likes)
-
-    # Public
-    @cache()
-    def get_track(self, track_id, streamable=False):
-        logger.debug('Getting info for track with id %s' % track_id)
-        try:
-            return self.parse_track(self._get('tracks/%s.json' % track_id),
-                                    streamable)
-        except Exception:
-            return None
+    def paged(self, path, parse=None):
+        """Windowed view of an API list such as ``<user>/favorites/``
 
-    def parse_track_uri(self, track):
-        logger.debug('Parsing track %s' % (track))
-        if hasattr(track, "uri"):
-            track = track.uri
-        return track.split('.')[-1]
+        Views are shared per path for ``cache_ttl`` seconds, so browsing
+        on through a list reuses the pages fetched so far.
 
-    def search(self, query):
+        :param parse: see :meth:`get_page`, fixed by the first caller
+        :return: :class:`PagedList`
+        """
+        items = self.lists.get(path)
+        if items is None:
+            items = PagedList(
+                lambda offset, limit: self.get_page(
+                    path, offset, limit, parse),
+                self.list_page_size, self.list_window,
+                lambda ranges: self.get_pages(path, ranges, parse))
+            self.lists.set(path, items)
+        return items
+
+    def list_tracks(self, path, limit=None):
+        """All cloudcasts of an API list as `Track`
+
+        The tracks are parsed from the list pages and seeded into the track
+        caches, so no request per cloudcast is made now or on later lookups.
+
+        :param path: list such as ``<user>/favorites/``
+        :param limit: most tracks returned, ``lookup_max_tracks`` by default
+        """
+        tracks = [self.records.track(record) for record in itertools.islice(
+            self.paged(path, self.parser.parse_record),
+            limit or self.lookup_max_tracks)]
+        self.seed_tracks(tracks)
+        return tracks
+
+    def seed_tracks(self, tracks):
+        """Cache and store tracks parsed from list payloads"""
+        keys = [(track.uri[len('mixcloud:'):], track) for track in tracks]
+        cached = MixcloudClient.resolve_url.cache_for(self)
+        for key, track in keys:
+            cached.set((key,), track)
+        if self.store and keys:
+            self.store.put_tracks(keys)
+            self.store_pictures(tracks)
+
+    def store_pictures(self, cloudcasts):
+        """Store the picture sources of parsed tracks or records, which
+        the stored `Track` objects cannot carry"""
+        if self.store:
+            self.store.put_pictures(
+                self.records.pictures(item.uri for item in cloudcasts))
+
+    def store_feed(self, url, page, etag=None, last_modified=None):
+        """Store a page of records as the `Track` objects they derive"""
+        self.store.put_feed(url, {
+            'data': [self.records.track(record) for record in page['data']],
+            'next': page['next'],
+        }, etag, last_modified)
+        self.store_pictures(page['data'])
+
+    def remember(self, tracks):
+        """Keep tracks restored from the metadata store as records, with
+        their stored pictures, and make them searchable
+
+        :return: list of their :class:`Cloudcast` records
+        """
+        new = [track for track in tracks if track.uri not in self.records]
+        uris = set(track.uri for track in new)
+        uris.update(artist.uri for track in new
+                    for artist in track.artists if artist.uri)
+        pictures = self.store.get_pictures(uris) if self.store and uris \
+            else {}
+        records = [self.records.add_track(track, pictures)
+                   for track in tracks]
+        for record in records:
+            self.index.add(record)
+        return records
+
+    def _stored_page(self, entry):
+        return {
+            'data': self.remember(entry.value['data']),
+            'next': entry.value['next'],
+        }
 
-        search_results = self._get(
-            'tracks.json?q=%s&filter=streamable&order=hotness&limit=%d' % (
-                quote_plus(query.encode('utf-8')), self.explore_songs))
-        tracks = []
-        for track in search_results:
-            tracks.append(self.parse_track(track, False))
-        return self.sanitize_tracks(tracks)
+    def _get_feed_page(self, url):
+        if self.store:
+            entry = self.store.get_feed(url)
+            if entry is not None:
+                self._revalidate_if_stale(
+                    url, entry, self._refresh_feed_page, url, entry)
+                return self._stored_page(entry)
+        return self._refresh_feed_page(url)
+
+    def fetch_feed_page(self, url):
+        """Fetch a feed page from the API, revalidating any stored copy"""
+        entry = self.store.get_feed(url) if self.store else None
+        return self._refresh_feed_page(url, entry)
+
+    def _refresh_feed_page(self, url, entry=None):
+        page, etag, last_modified = self._get_conditional(
+            url, entry, self.parse_feed_page)
+        if page is None:
+            self.store.touch_feed(url)
+            return self._stored_page(entry)
+        if self.store:
+            self.store_feed(url, page, etag, last_modified)
+        return page
+
+    def parse_feed_page(self, result):
+        """Parse the cloudcasts of an API feed response into a page of
+        records"""
+        return {
+            'data': self.parser.parse_records([
+                item[u'cloudcasts'][0]
+                for item in result.get(STR_DATA, [])
+                if item.get(u'cloudcasts')]),
+            'next': result.get(u'paging', {}).get(u'next'),
+        }
 
-    def parse_results(self, res):
-        tracks = []
-        for track in res:
-            tracks.append(self.parse_track(track))
-        return self.sanitize_tracks(tracks)
+    @cache()
+    def search(self, query):
+        """Search cloudcasts through the API, the results also land in the
+        local index"""
+        return self._get(
+            'search/?q=%s&type=cloudcast&limit=%d' % (
+                quote_plus(query.encode('utf-8')), self.explore_songs),
+            self.parse_list)
+
+    def parse_list(self, result):
+        """Parse the cloudcasts of an API list response"""
+        return self.parser.parse_page(result.get(STR_DATA, []))
+
+    def search_local(self, query, exact=False):
+        """Search the cloudcasts seen so far, merged with the API results
+        once a background search for ``query`` has completed
+
+        :return: list of `Track`, best matches first
+        """
+        tracks = self.records.tracks(
+            self.index.search(query, self.explore_songs, exact))
+        remote = MixcloudClient.search.cache_for(self).get((query,))
+        if remote is None:
+            if len(query.strip()) >= self.search_min_length:
+                self.search_later(query)
+            return tracks
+        seen = set(track.uri for track in tracks)
+        return tracks + [track for track in remote if track.uri not in seen]
+
+    def search_later(self, query):
+        """Search the API for ``query`` in the background once no other
+        query came in for ``search_debounce`` seconds, so search as you
+        type only sends the query the user stopped at"""
+        with self._search_lock:
+            if self._search_timer is not None:
+                self._search_timer.cancel()
+            self._search_timer = threading.Timer(
+                self.search_debounce, self._try_search, (query,))
+            self._search_timer.daemon = True
+            self._search_timer.start()
+
+    def _try_search(self, query):
+        try:
+            self.search(query)
+        except Exception as e:
+            logger.warn('Searching Mixcloud for %s failed: %s' % (query, e))
 
+    @timed('get_track_uri')
     def get_track_uri(self, uri):
+        return self.inflight.do(('stream', uri), self._get_track_uri, uri)
+
+    def _get_track_uri(self, uri):
         ck=URL_MIXCLOUD[:-1]+uri
         logger.debug('Locally resolving cloudcast stream for '+ck)
         headers={
             'User-Agent' : 'Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/35.0.1916.27 Safari/537.36',
             'Referer' : URL_MIXCLOUD
         }
-        response = self.http_client.get(ck, headers=headers)
-        response.raise_for_status()
-        data=response.text
-        match=re.search('m-p-ref="cloudcast_page" m-play-info="(.*)" m-preview=', data)
-        if match:
+        response = self._request(
+            ck, headers=headers, stream=True, endpoint='page')
+        try:
+            response.raise_for_status()
+            encoded, read = find_play_info(
+                response.iter_content(chunk_size=16384))
+        finally:
+            response.close()
+        logger.debug('Read %d bytes of %s' % (read, ck))
+        if encoded:
             try:
-                logger.debug('Decoding '+match.group(1))
-                playInfo=base64.b64decode(match.group(1))
-                magicString=base64.b64decode('cGxlYXNlZG9udGRvd25sb2Fkb3VybXVzaWN0aGVhcnRpc3Rzd29udGdldHBhaWQ=')
-                playInfoJSON=''.join(chr(ord(a) ^ ord(b)) for a,b in zip(playInfo,cycle(magicString)))
-                json_content=json.loads(playInfoJSON)
+                json_content = self.play_info_decoder.decode(encoded)
                 if STR_STREAMURL in json_content and json_content[STR_STREAMURL]:
                     return json_content[STR_STREAMURL]
                 else:
@@ -392,90 +465,282 @@ class MixcloudClient(object):
         else:
             logger.debug('Unable to resolve (match)')
 
-    def _get(self, url):
+    @timed('get')
+    def _get(self, url, parse=None):
+        return self.inflight.do(
+            ('get', url, parse), self._fetch_json, api_url(url), parse)
 
+    def get_many(self, paths, parse=None):
+        """GET API ``paths`` concurrently through the I/O engine
 
-        logger.debug('Requesting %s' % url)
-        res = self.http_client.get(URL_API + url)
-        res.raise_for_status()
-        return res.json()
-
-    def sanitize_tracks(self, tracks):
-        return filter(None, tracks)
+        :param parse: see :meth:`_fetch_validated`
+        :return: list of parsed JSON, or the exception raised for a path
+        """
+        return self.engine.get_json_many(
+            [api_url(path) for path in paths], parse)
 
-    @cache()
-    def resolve_url(self, url):
+    def _fetch_json(self, url, parse=None):
+        return self._fetch_validated(url, parse)[0]
 
-        return self.parse_track(self._get(url))
+    def _fetch_validated(self, url, parse=None):
+        """GET ``url`` as JSON, revalidating an earlier response
 
+        Only the validators of a response and what ``parse`` made of it are
+        kept, per ``parse``. A 304 answer reuses that result without
+        decoding or parsing anything.
 
+        :param parse: optional callable applied to the JSON
+        :return: tuple of parsed json or the result of ``parse``, ETag and
+            Last-Modified
+        """
+        cached, headers = self._revalidation(url, parse)
+        logger.debug('Requesting %s' % url)
+        try:
+            res = self._request(url, headers=headers)
+        except (CircuitOpenError, IOError) as e:
+            if cached is None:
+                raise
+            return self._serve_cached(url, cached, e)
+        return self._validated(url, parse, cached, res)
+
+    def _revalidation(self, url, parse):
+        """Earlier response of ``url`` kept for ``parse``, or ``None``, and
+        the headers asking whether it changed"""
+        cached = self.responses.get((url, parse))
+        headers = {}
+        if cached is not None:
+            if cached[1]:
+                headers['If-None-Match'] = cached[1]
+            if cached[2]:
+                headers['If-Modified-Since'] = cached[2]
+        return cached, headers
+
+    def _validated(self, url, parse, cached, res):
+        """Result of a response to the request :meth:`_revalidation` set
+        up, kept for later revalidation if it has validators"""
+        if res.status_code == 304 and cached is not None:
+            self._count_not_modified()
+            return cached
+        if res.status_code >= 500 and cached is not None:
+            res.close()
+            return self._serve_cached(url, cached, res.status_code)
+        res.raise_for_status()
+        data = res.json()
+        value = parse(data) if parse else data
+        etag = res.headers.get('ETag')
+        last_modified = res.headers.get('Last-Modified')
+        if etag or last_modified:
+            self.responses.set((url, parse), (value, etag, last_modified))
+        return value, etag, last_modified
+
+    def _count_not_modified(self):
+        with self._not_modified_lock:
+            self.not_modified += 1
+
+    def _serve_cached(self, url, cached, reason):
+        logger.debug('Serving cached %s, Mixcloud failed: %s' % (url, reason))
+        self.metrics.incr('http.served_cached')
+        return cached
+
+    def _request(self, url, headers=None, stream=False, endpoint='api'):
+        """GET ``url`` within the rate limit and the timeouts of
+        ``endpoint``
+
+        Connection errors, timeouts and 5xx responses count against the
+        endpoint's circuit breaker and are retried after a jittered backoff,
+        429 responses are retried after the server's Retry-After. Retries
+        share the connect and read timeout of the first attempt, so a call
+        blocks little longer than a single request could.
+
+        :raise CircuitOpenError: while the endpoint's circuit is open
+        """
+        metrics = self.metrics
+        breaker = self.breakers[endpoint]
+        connect, read = self.timeouts[endpoint]
+        deadline = time.time() + connect + read
+        for attempt in range(self.http_retries + 1):
+            if not breaker.allow():
+                metrics.incr('http.rejected')
+                raise CircuitOpenError(
+                    'Mixcloud %s requests are paused' % endpoint)
+            self.limiter.acquire()
+            # retries only get what is left of the budget to read
+            timeout = (connect, max(
+                min(read, deadline - time.time() - connect), 0.1))
+            metrics.incr('http.inflight')
+            res = error = None
+            try:
+                with metrics.timer('http.request'):
+                    res = self.http_client.get(
+                        url, headers=headers, stream=stream, timeout=timeout)
+            except IOError as e:
+                metrics.incr('http.errors')
+                error = e
+            finally:
+                metrics.incr('http.inflight', -1)
+            if res is not None:
+                metrics.incr('http.status.%d' % res.status_code)
+                if res.status_code < 500:
+                    breaker.succeeded()
+                if res.status_code == 429:
+                    res.close()
+                    retry_after = parse_retry_after(
+                        res.headers.get('Retry-After'))
+                    self.limiter.throttled(retry_after)
+                    if not self._retry_in_time(
+                            attempt, retry_after or 0, connect, deadline):
+                        return res
+                    continue
+                self.limiter.succeeded()
+                if res.status_code < 500:
+                    return res
+            breaker.failed()
+            delay = backoff_delay(attempt, self.http_backoff)
+            if not self._retry_in_time(attempt, delay, connect, deadline):
+                if error is not None:
+                    raise error
+                return res
+            if res is not None:
+                res.close()
+            metrics.incr('http.retries')
+            time.sleep(delay)
+        return res
+
+    def _retry_in_time(self, attempt, delay, connect, deadline):
+        """Whether another attempt is allowed and can still connect before
+        ``deadline`` after waiting ``delay`` seconds"""
+        return attempt < self.http_retries and \
+            time.time() + delay + connect < deadline
+
+    @cache(stale=True)
+    def resolve_url(self, url):
+        track = self._stored_track(url)
+        if track is None:
+            track = self._refresh_track(url)
+        return track
 
-    @cache()
-    def parse_track(self, data, remote_url=False):
-        if not data:
+    def _stored_track(self, url):
+        """Track of ``url`` from the metadata store, revalidated in the
+        background when stale, or ``None``"""
+        entry = self.store.get_track(url) if self.store else None
+        if entry is None:
             return None
+        self._revalidate_if_stale(url, entry, self._refresh_track, url, entry)
+        self.remember([entry.value])
+        return entry.value
 
-        # NOTE kwargs dict keys must be bytestrings to work on Python < 2.6.5
-        # See https://github.com/mopidy/mopidy/issues/302 for details.
-
-        track_kwargs = {}
-        artist_kwargs = {}
-        album_kwargs = {}
-
-        if STR_NAME in data:
-            name = data[STR_NAME]
-            label_name = data.get(STR_NAME)
-
-            if bool(label_name):
-                track_kwargs[b'name'] = name
-                artist_kwargs[b'name'] = label_name
-            else:
-                track_kwargs[b'name'] = name
-                artist_kwargs[b'name'] = data[STR_USER]['name']
-
-            album_kwargs[b'name'] = 'Mixcloud'
-
-        if STR_DATE in data:
-            track_kwargs[b'date'] = data[STR_DATE]
-
-        track_kwargs[b'uri'] = 'mixcloud:' + data.get('key')
+    @property
+    def pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                from multiprocessing.pool import ThreadPool
+                self._pool = ThreadPool(processes=self.lookup_workers)
+            return self._pool
 
+    @property
+    def http_client(self):
+        """`requests.Session` shared by all requests, created on first use
+        so starting Mopidy does not pay for importing requests"""
+        if self._http_client is None:
+            with self._http_lock:
+                if self._http_client is None:
+                    self._http_client = build_session(
+                        self.config, self.lookup_workers)
+        return self._http_client
 
-        track_kwargs[b'length'] = int(data.get('duration', 0))
-        track_kwargs[b'comment'] = data.get('permalink_url', '')
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    self._engine = create_engine(self, self.config)
+        return self._engine
+
+    def close(self):
+        """Stop the worker pool and drop pooled connections"""
+        with self._search_lock:
+            if self._search_timer is not None:
+                self._search_timer.cancel()
+        with self._engine_lock:
+            if self._engine is not None:
+                self._engine.close()
+                self._engine = None
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool = None
+        with self._http_lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+    def _refresh_track(self, url, entry=None):
+        track, etag, last_modified = self._get_conditional(
+            api_url(url), entry, self.parse_track)
+        if track is None and entry is not None:
+            self.store.touch_track(url)
+            return entry.value
+        if self.store and track:
+            self.store.put_track(url, track, etag, last_modified)
+            self.store_pictures([track])
+        return track
 
-        if artist_kwargs:
-            artist = Artist(**artist_kwargs)
-            track_kwargs[b'artists'] = [artist]
+    def _get_conditional(self, url, entry=None, parse=None):
+        """GET ``url`` revalidating against a stored entry
 
-        """if album_kwargs:
-            if 'artwork_url' in data and data['artwork_url']:
-                album_kwargs[b'images'] = [data['artwork_url']]
-            else:
-                image = data.get('user').get('avatar_url')
-                album_kwargs[b'images'] = [image]
+        Concurrent calls for the same url and validators share one request.
 
-            album = Album(**album_kwargs)
-            track_kwargs[b'album'] = album
+        :param parse: see :meth:`_fetch_validated`
+        :return: tuple of parsed json or the result of ``parse`` (``None``
+            when the entry is still current), ETag and Last-Modified
         """
-        track = Track(**track_kwargs)
-        return track
-
-    @cache()
-    def can_be_streamed(self, url):
-        req = self.http_client.head(self.get_streamble_url(url))
-        return req.status_code == 302
-
-    def get_streamble_url(self, url):
-        return '%s?client_id=%s' % (url, self.CLIENT_ID)
+        etag = last_modified = None
+        if entry is not None:
+            etag, last_modified = entry.etag, entry.last_modified
+        return self.inflight.do(
+            ('conditional', url, etag, last_modified, parse),
+            self._fetch_conditional, url, entry, parse)
+
+    def _fetch_conditional(self, url, entry, parse=None):
+        if entry is None:
+            return self._fetch_validated(url, parse)
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        logger.debug('Requesting %s' % url)
+        res = self._request(url, headers=headers)
+        if res.status_code == 304:
+            self._count_not_modified()
+            return None, entry.etag, entry.last_modified
+        res.raise_for_status()
+        data = res.json()
+        return (parse(data) if parse else data, res.headers.get('ETag'),
+                res.headers.get('Last-Modified'))
+
+    def _revalidate_if_stale(self, key, entry, func, *args):
+        if entry.age() >= self.cache_ttl:
+            self.revalidate(key, func, *args)
+
+    def revalidate(self, key, func, *args):
+        """Run ``func(*args)`` on the worker pool unless a revalidation of
+        ``key`` is already running"""
+        with self._revalidating_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                func(*args)
+            except Exception as e:
+                logger.debug('Background revalidation failed: %s' % e)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(key)
 
-    def resolve_tracks(self, track_ids):
-        """Resolve tracks concurrently emulating browser
+        self.pool.apply_async(run)
 
-        :param track_ids:list of track ids
-        :return:list `Track`
-        """
-        pool = ThreadPool(processes=16)
-        tracks = pool.map(self.get_track, track_ids)
-        pool.close()
-        return self.sanitize_tracks(tracks)
+    def parse_track(self, data):
+        return self.parser.parse(data)
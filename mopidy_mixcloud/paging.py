@@ -0,0 +1,123 @@
+from __future__ import unicode_literals
+
+import logging
+
+from .cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+
+class PagedList(object):
+    """Windowed view of a paginated API list.
+
+    Pages of ``page_size`` items are fetched when an index or slice needs
+    them and only the ``window`` most recently used pages are kept, so
+    memory and the latency of the first items do not grow with the length
+    of the list. Pages hold their items already parsed, so no raw API JSON
+    is kept. Items keep their API positions, unusable ones are ``None`` and
+    skipped.
+
+    :param fetch: callable ``fetch(offset, limit)`` returning a dict with
+        the parsed page ``data`` and the ``next`` page url
+    :param page_size: items requested per page
+    :param window: number of pages kept
+    :param fetch_many: optional callable mapping a list of ``(offset,
+        limit)`` to their pages or exceptions, used to fetch the pages
+        after the first of a read spanning several pages concurrently, up
+        to ``window`` at a time
+    """
+
+    def __init__(self, fetch, page_size=50, window=4, fetch_many=None):
+        self.fetch = fetch
+        self.fetch_many = fetch_many
+        self.page_size = page_size
+        self.window = window
+        self.length = None
+        self.fetched = 0
+        self._pages = LRUCache(maxsize=window, ttl=0)
+
+    def page(self, number):
+        """Return the items of a page"""
+        page = self._pages.get(number)
+        if page is None:
+            offset = number * self.page_size
+            logger.debug('Fetching list page at %d', offset)
+            page = self._add(number, self.fetch(offset, self.page_size))
+        return page
+
+    def load(self, first, last):
+        """Fetch the missing pages ``first`` to ``last`` in one batch
+        through ``fetch_many``, failed ones are left to :meth:`page`"""
+        if self.fetch_many is None:
+            return
+        numbers = [number for number in range(first, last + 1)
+                   if number not in self._pages]
+        if len(numbers) < 2:
+            return
+        logger.debug('Fetching %d list pages from %d', len(numbers),
+                     numbers[0] * self.page_size)
+        results = self.fetch_many([(number * self.page_size, self.page_size)
+                                   for number in numbers])
+        for number, result in zip(numbers, results):
+            if not isinstance(result, Exception):
+                self._add(number, result)
+
+    def _add(self, number, result):
+        self.fetched += 1
+        data = result['data']
+        end = number * self.page_size + len(data)
+        if (not result['next'] or not data) and (
+                self.length is None or end < self.length):
+            self.length = end
+        self._pages.set(number, data)
+        return data
+
+    def items(self, number, start=0, stop=None):
+        """Items of a page between positions ``start`` and ``stop`` within
+        the page, ``None`` for skipped ones"""
+        return self.page(number)[start:stop]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.start or 0, index.stop, index.step
+            if start < 0 or stop is None or stop < 0 or step not in (None, 1):
+                raise ValueError('Only forward slices with an end are '
+                                 'supported')
+            return list(self.islice(start, stop))
+        if self.length is not None and index >= self.length:
+            raise IndexError(index)
+        number, position = divmod(index, self.page_size)
+        items = self.items(number, position, position + 1)
+        if not items or items[0] is None:
+            raise IndexError(index)
+        return items[0]
+
+    def islice(self, start, stop=None):
+        """Yield the items from API position ``start`` up to ``stop``"""
+        number = start // self.page_size
+        while stop is None or number * self.page_size < stop:
+            if self.length is not None and number * self.page_size >= \
+                    self.length:
+                return
+            first = number * self.page_size
+            # the first page comes alone so short lists cost one request
+            if number and number not in self._pages:
+                last = number + self.window - 1
+                if stop is not None:
+                    last = min(last, (stop - 1) // self.page_size)
+                if self.length is not None:
+                    last = min(last, (self.length - 1) // self.page_size)
+                self.load(number, last)
+            for item in self.items(number, max(start - first, 0),
+                                   None if stop is None else stop - first):
+                if item is not None:
+                    yield item
+            number += 1
+
+    def __iter__(self):
+        return self.islice(0)
+
+    def has_more(self, offset):
+        """Whether the list may continue at API position ``offset``"""
+        return self.length is None or offset < self.length
@@ -0,0 +1,70 @@
+from __future__ import unicode_literals
+
+import logging
+
+from .records import RecordStore
+
+
+logger = logging.getLogger(__name__)
+
+
+class CloudcastParser(object):
+    """Turn Mixcloud API cloudcast JSON straight into `Track` objects.
+
+    Every cloudcast is kept as a compact record of the :class:`RecordStore`
+    and the returned `Track` is derived from it, users are shared between
+    all of their cloudcasts.
+
+    :param records: :class:`RecordStore` keeping the parsed cloudcasts
+    :param index: optional :class:`SearchIndex` every parsed cloudcast is
+        added to
+    """
+
+    def __init__(self, records=None, index=None):
+        self.records = records if records is not None else RecordStore()
+        self.index = index
+
+    def parse(self, data):
+        """Parse one cloudcast
+
+        :param data: cloudcast JSON as returned by the API
+        :return: `Track` or ``None`` if the cloudcast is unusable
+        """
+        record = self.parse_record(data)
+        return self.records.track(record) if record is not None else None
+
+    def parse_record(self, data):
+        """Keep one cloudcast as a record, without deriving its `Track`
+
+        :param data: cloudcast JSON as returned by the API
+        :return: :class:`Cloudcast` or ``None`` if the cloudcast is unusable
+        """
+        try:
+            record = self.records.add(data)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.warn('Skipping malformed cloudcast %s: %s',
+                        data.get('key') if isinstance(data, dict) else data,
+                        e)
+            return None
+        if record is not None and self.index is not None:
+            self.index.add(record, data.get('description'))
+        return record
+
+    def parse_page(self, items):
+        """Parse a page of cloudcasts, skipping unusable ones
+
+        :param items: list of cloudcast JSON objects
+        :return: list of `Track`
+        """
+        parse = self.parse
+        return [track for track in (parse(item) for item in items) if track]
+
+    def parse_records(self, items):
+        """Keep a page of cloudcasts as records, skipping unusable ones
+
+        :param items: list of cloudcast JSON objects
+        :return: list of :class:`Cloudcast`
+        """
+        parse = self.parse_record
+        return [record for record in (parse(item) for item in items)
+                if record is not None]
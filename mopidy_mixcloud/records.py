@@ -0,0 +1,254 @@
+from __future__ import unicode_literals
+
+import collections
+import logging
+import threading
+import weakref
+
+from mopidy.models import Album, Artist, Ref, Track
+
+from .images import picture_source
+
+
+logger = logging.getLogger(__name__)
+
+ALBUM = Album(name='Mixcloud')
+URL_MIXCLOUD = 'https://www.mixcloud.com'
+
+
+class User(object):
+    """Compact Mixcloud user, shared by all records of its cloudcasts.
+
+    Users without a key are not shared and have no uri.
+    """
+
+    __slots__ = ('key', 'name', 'picture', '__weakref__')
+
+    def __init__(self, key, name, picture=None):
+        self.key = key
+        self.name = name
+        self.picture = picture
+
+    @property
+    def uri(self):
+        return 'mixcloud:user:' + self.key if self.key else None
+
+
+class Cloudcast(object):
+    """Compact cloudcast record.
+
+    The key is kept as the slug below the user's key, tags and dates are
+    interned, and the Mixcloud url is derived from the key.
+    """
+
+    __slots__ = ('user', 'slug', 'name', 'seconds', 'date', 'tags',
+                 'picture')
+
+    def __init__(self, user, slug, name, seconds=0, date=None, tags=(),
+                 picture=None):
+        self.user = user
+        self.slug = slug
+        self.name = name
+        self.seconds = seconds
+        self.date = date
+        self.tags = tags
+        self.picture = picture
+
+    @property
+    def key(self):
+        if self.user and self.user.key:
+            return self.user.key + self.slug
+        return self.slug
+
+    @property
+    def uri(self):
+        return 'mixcloud:' + self.key
+
+
+class RecordStore(object):
+    """The cloudcasts seen so far as compact records, by uri.
+
+    Search and image lookups read the records, and `Track`, `Artist` and
+    `Ref` objects are derived from them on demand. The list windows, the
+    feed snapshot and the category index hold records too, only the
+    resolve_url and search caches hold the `Track` objects they handed
+    out. The first added records are dropped beyond
+    ``maxsize``, updating a record keeps its place. Users are shared
+    between records and dropped with the last one referring to them.
+
+    :param maxsize: number of cloudcasts kept
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._records = {}
+        self._order = collections.deque()
+        self._users = weakref.WeakValueDictionary()
+        self._artists = weakref.WeakValueDictionary()
+        self._strings = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, uri):
+        return uri in self._records
+
+    def intern(self, value):
+        """Share equal strings of the small vocabularies: tags and dates"""
+        if value is None:
+            return None
+        return self._strings.setdefault(value, value)
+
+    def user(self, data, picture=None):
+        """Return the shared record of an API user, updating it
+
+        :param picture: picture source used if ``data`` has no pictures
+        """
+        key = data.get('key')
+        name = data.get('name') or data.get('username')
+        picture = picture_source(data.get('pictures')) or picture
+        if not key:
+            return User(None, name, picture) if name else None
+        with self._lock:
+            user = self._users.get(key)
+            if user is None:
+                user = self._users[key] = User(key, name, picture)
+            else:
+                user.name = name or user.name
+                user.picture = picture or user.picture
+        return user
+
+    def add(self, data):
+        """Keep an API cloudcast
+
+        :return: the :class:`Cloudcast` or ``None`` if it is unusable
+        """
+        if not data or not data.get('key') or not data.get('name'):
+            return None
+        created = data.get('created_time')
+        tags = data.get('tags')
+        picture = picture_source(data.get('pictures'))
+        user = self.user(data.get('user') or {})
+        if user and picture == user.picture:
+            # most cloudcasts show their user's picture
+            picture = None
+        record = Cloudcast(
+            user, self._slug(user, data['key']), data['name'],
+            int(data.get('audio_length') or 0),
+            self.intern(created[:10]) if created else None,
+            tuple(self.intern(tag.get('name')) for tag in tags or ()
+                  if tag.get('name')),
+            picture)
+        self._put(record)
+        return record
+
+    def add_track(self, track, pictures=None):
+        """Keep a `Track` restored from disk, unless its cloudcast is
+        already known with richer data
+
+        :param pictures: dict of stored picture sources by cloudcast and
+            user uri, as from :meth:`pictures`
+        """
+        record = self._records.get(track.uri)
+        if record is not None:
+            return record
+        pictures = pictures or {}
+        artist = next(iter(track.artists), None)
+        user = None
+        if artist is not None:
+            user = self.user({
+                'key': artist.uri[len('mixcloud:user:'):]
+                if artist.uri else None,
+                'name': artist.name}, pictures.get(artist.uri))
+        record = Cloudcast(
+            user, self._slug(user, track.uri[len('mixcloud:'):]), track.name,
+            (track.length or 0) // 1000, self.intern(track.date),
+            tuple(self.intern(tag) for tag in track.genre.split(', '))
+            if track.genre else (),
+            pictures.get(track.uri))
+        self._put(record)
+        return record
+
+    def pictures(self, uris):
+        """Picture sources of the given cloudcasts and of their users,
+        for storing next to their tracks
+
+        :return: list of ``(uri, source)``
+        """
+        pictures = {}
+        for uri in uris:
+            record = self._records.get(uri)
+            if record is None:
+                continue
+            if record.picture:
+                pictures[uri] = record.picture
+            user = record.user
+            if user and user.key and user.picture:
+                pictures[user.uri] = user.picture
+        return list(pictures.items())
+
+    def _slug(self, user, key):
+        if user and user.key and key.startswith(user.key):
+            return key[len(user.key):]
+        return key
+
+    def _put(self, record):
+        uri = record.uri
+        with self._lock:
+            if uri not in self._records:
+                self._order.append(uri)
+            self._records[uri] = record
+            while len(self._records) > self.maxsize:
+                self._records.pop(self._order.popleft(), None)
+
+    def get(self, uri):
+        return self._records.get(uri)
+
+    def picture(self, uri):
+        """Picture source of a cloudcast or user uri, or ``None``"""
+        if uri.startswith('mixcloud:user:'):
+            user = self._users.get(uri[len('mixcloud:user:'):])
+            return user.picture if user else None
+        record = self._records.get(uri)
+        if record is None:
+            return None
+        return record.picture or (record.user.picture if record.user
+                                  else None)
+
+    def artist(self, user):
+        if not user.key:
+            return Artist(name=user.name)
+        artist = self._artists.get(user.key)
+        if artist is None or artist.name != user.name:
+            artist = self._artists[user.key] = Artist(
+                name=user.name, uri=user.uri)
+        return artist
+
+    def track(self, record):
+        key = record.key
+        return Track(
+            uri='mixcloud:' + key,
+            name=record.name,
+            artists=[self.artist(record.user)] if record.user else [],
+            album=ALBUM,
+            length=record.seconds * 1000 or None,
+            date=record.date,
+            genre=', '.join(record.tags) if record.tags else None,
+            comment=URL_MIXCLOUD + key)
+
+    def ref(self, record):
+        return Ref.track(uri=record.uri, name=record.name)
+
+    def tracks(self, uris):
+        """Derive the `Track` of every known uri, skipping unknown ones"""
+        records = self._records
+        return [self.track(records[uri]) for uri in uris if uri in records]
+
+    def stats(self):
+        return {
+            'cloudcasts': len(self._records),
+            'users': len(self._users),
+            'strings': len(self._strings),
+            'maxsize': self.maxsize,
+        }
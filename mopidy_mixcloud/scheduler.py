@@ -0,0 +1,143 @@
+from __future__ import unicode_literals
+
+import heapq
+import logging
+import random
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler(object):
+    """Refresh cached resources in the background on their own intervals.
+
+    A job starts once :meth:`used` reports its resource was used, so
+    resources nobody looks at are never refreshed. Its first run comes
+    ``interval`` seconds after the resource was fetched, and every further
+    run ``interval`` seconds after the previous one, each shifted randomly
+    by up to ``jitter`` of the interval so players started together do not
+    hit the API in lockstep. Jobs replace cached values in place, so
+    readers keep getting the previous data while a refresh runs or after
+    it failed. A failed job is retried after ``retry`` seconds, or its
+    interval if that is shorter.
+
+    :param jitter: fraction of the interval runs are shifted by
+    :param retry: seconds before a failed job runs again
+    """
+
+    def __init__(self, jitter=0.1, retry=60, timer=time.time,
+                 random=random.random):
+        self.jitter = jitter
+        self.retry = retry
+        self.timer = timer
+        self.random = random
+        self.runs = 0
+        self.failures = 0
+        self._jobs = {}
+        self._started = set()
+        self._queue = []
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def add(self, name, interval, func):
+        """Run ``func()`` every ``interval`` seconds once ``name`` was
+        used. Jobs with no interval are ignored."""
+        if not interval:
+            return
+        with self._condition:
+            self._jobs[name] = (interval, func)
+
+    def used(self, name, fetched=None):
+        """Start the job ``name`` if it was not started yet
+
+        :param fetched: time the resource was fetched, now by default
+        """
+        if name not in self._jobs or name in self._started:
+            return
+        with self._condition:
+            if name in self._started:
+                return
+            self._started.add(name)
+            interval, func = self._jobs[name]
+            heapq.heappush(self._queue, (
+                self.next_run(interval, start=fetched), name, interval, func))
+            self._condition.notify()
+
+    def next_run(self, interval, ok=True, start=None):
+        if not ok:
+            interval = min(interval, self.retry)
+        shift = interval * self.jitter * (2 * self.random() - 1)
+        return (start or self.timer()) + interval + shift
+
+    def run_pending(self):
+        """Run every job that is due
+
+        :return: number of jobs run
+        """
+        due = []
+        with self._condition:
+            now = self.timer()
+            while self._queue and self._queue[0][0] <= now:
+                due.append(heapq.heappop(self._queue))
+        for _, name, interval, func in due:
+            ok = self._run(name, func)
+            with self._condition:
+                heapq.heappush(self._queue, (
+                    self.next_run(interval, ok), name, interval, func))
+        return len(due)
+
+    def _run(self, name, func):
+        logger.debug('Refreshing Mixcloud %s', name)
+        with self._condition:
+            self.runs += 1
+        try:
+            func()
+            return True
+        except Exception as e:
+            with self._condition:
+                self.failures += 1
+            logger.warn('Refreshing Mixcloud %s failed: %s', name, e)
+            return False
+
+    def start(self):
+        if self._thread is not None or not self._jobs:
+            return
+        self._thread = threading.Thread(
+            target=self._loop, name='MixcloudRefresh')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if not self._queue:
+                        # until a job is started
+                        self._condition.wait()
+                        continue
+                    wait = self._queue[0][0] - self.timer()
+                    if wait <= 0:
+                        break
+                    self._condition.wait(wait)
+                if self._stopped:
+                    return
+            self.run_pending()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'jobs': len(self._jobs),
+                'started': len(self._started),
+                'runs': self.runs,
+                'failures': self.failures,
+            }
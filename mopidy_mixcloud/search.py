@@ -0,0 +1,121 @@
+from __future__ import unicode_literals
+
+import bisect
+import collections
+import logging
+import re
+import threading
+import unicodedata
+
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Weight of a term by the field it was found in
+TITLE, ARTIST, TAG, DESCRIPTION = 4, 3, 2, 1
+
+
+def tokenize(text):
+    """Lower case, accent free words of ``text``"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', unicode(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex(object):
+    """In-memory inverted index over the cloudcasts seen so far.
+
+    Every query term must match a word of the title, artist, tags or
+    description; the last term also matches as a prefix so incremental
+    searches find results while the user is typing. The oldest cloudcasts
+    are dropped once ``max_tracks`` is reached.
+
+    Only the uris and term weights are kept, results are looked up in the
+    :class:`RecordStore`.
+    """
+
+    def __init__(self, max_tracks=20000):
+        self.max_tracks = max_tracks
+        self._weights = collections.OrderedDict()
+        self._postings = collections.defaultdict(dict)
+        self._terms = []
+        self._terms_dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._weights)
+
+    def add(self, record, description=None):
+        """Index a :class:`Cloudcast` record"""
+        uri = record.uri
+        weights = {}
+        fields = [(record.name, TITLE), (description, DESCRIPTION)]
+        fields.extend((tag, TAG) for tag in record.tags)
+        if record.user:
+            fields.append((record.user.name, ARTIST))
+        for text, weight in fields:
+            for term in tokenize(text):
+                if weights.get(term, 0) < weight:
+                    weights[term] = weight
+        with self._lock:
+            old_weights = self._weights.pop(uri, None)
+            if old_weights is not None:
+                if description is None:
+                    # keep the description terms of a richer earlier entry
+                    for term, weight in old_weights.items():
+                        if weight == DESCRIPTION and term not in weights:
+                            weights[term] = weight
+                self._unlink(uri, old_weights)
+            self._weights[uri] = weights
+            for term, weight in weights.items():
+                postings = self._postings[term]
+                if not postings:
+                    self._terms_dirty = True
+                postings[uri] = weight
+            while len(self._weights) > self.max_tracks:
+                uri, old_weights = self._weights.popitem(last=False)
+                self._unlink(uri, old_weights)
+
+    def _unlink(self, uri, weights):
+        for term in weights:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(uri, None)
+                if not postings:
+                    del self._postings[term]
+                    self._terms_dirty = True
+
+    def _prefixed(self, prefix):
+        if self._terms_dirty:
+            self._terms = sorted(self._postings)
+            self._terms_dirty = False
+        i = bisect.bisect_left(self._terms, prefix)
+        while i < len(self._terms) and self._terms[i].startswith(prefix):
+            yield self._terms[i]
+            i += 1
+
+    def search(self, query, limit=None, exact=False):
+        """Return the uris matching every term of ``query``, best first"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            scores = None
+            for i, term in enumerate(terms):
+                matches = dict(self._postings.get(term, {}))
+                if not exact and i == len(terms) - 1:
+                    for other in self._prefixed(term):
+                        for uri, weight in self._postings[other].items():
+                            matches[uri] = max(matches.get(uri, 0), weight)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = dict((uri, score + matches[uri])
+                                  for uri, score in scores.items()
+                                  if uri in matches)
+                if not scores:
+                    return []
+            return sorted(scores, key=scores.get, reverse=True)[:limit]
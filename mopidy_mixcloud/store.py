@@ -0,0 +1,200 @@
+from __future__ import unicode_literals
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from mopidy.models import ModelJSONEncoder, model_json_decoder
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 5
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cloudcasts (
+    key TEXT PRIMARY KEY,
+    track TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS feeds (
+    url TEXT PRIMARY KEY,
+    items TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pictures (
+    uri TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    fetched REAL NOT NULL
+);
+'''
+
+TABLES = ('cloudcasts', 'feeds', 'pictures')
+
+# SQLite allows 999 parameters per statement
+MAX_PARAMETERS = 500
+
+
+class Entry(object):
+    """A stored value together with its HTTP validators."""
+
+    __slots__ = ('value', 'etag', 'last_modified', 'fetched')
+
+    def __init__(self, value, etag=None, last_modified=None, fetched=0):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched = fetched
+
+    def age(self, now=None):
+        return (now or time.time()) - self.fetched
+
+
+class MetadataStore(object):
+    """Persistent SQLite store of parsed cloudcasts and feed listings.
+
+    Cloudcasts are keyed by their Mixcloud key and kept as serialized
+    :class:`mopidy.models.Track`, feeds are keyed by URL. Every row keeps
+    the ETag/Last-Modified validators and the time it was fetched so the
+    client can revalidate it in the background. The picture sources of
+    cloudcasts and users, which `Track` has no field for, are kept by uri.
+    Rows not fetched again within ``max_age`` seconds are deleted when the
+    store is opened.
+
+    :param path: database file, usually inside the extension cache dir
+    :param max_age: seconds rows are kept, forever if ``None`` or 0
+    """
+
+    def __init__(self, path, max_age=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            version = self._db.execute('PRAGMA user_version').fetchone()[0]
+            if version != SCHEMA_VERSION:
+                logger.debug('Resetting metadata store, schema changed')
+                self._db.executescript(''.join(
+                    'DROP TABLE IF EXISTS %s;' % table for table in TABLES) +
+                    'PRAGMA user_version = %d;' % SCHEMA_VERSION)
+            self._db.executescript(SCHEMA)
+        if max_age:
+            self.prune(max_age)
+        logger.debug('Opened Mixcloud metadata store %s', path)
+
+    def prune(self, max_age):
+        """Delete the rows fetched more than ``max_age`` seconds ago
+
+        :return: number of rows deleted
+        """
+        before = time.time() - max_age
+        with self._lock, self._db:
+            deleted = sum(
+                self._db.execute(
+                    'DELETE FROM %s WHERE fetched < ?' % table,
+                    (before,)).rowcount
+                for table in TABLES)
+        if deleted:
+            logger.debug('Pruned %d rows from the metadata store', deleted)
+        return deleted
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _select(self, table, column, key):
+        with self._lock:
+            return self._db.execute(
+                'SELECT * FROM %s WHERE %s = ?' % (table, column),
+                (key,)).fetchone()
+
+    def _replace(self, table, row):
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO %s VALUES (?, ?, ?, ?, ?)' % table,
+                row)
+
+    def get_track(self, key):
+        row = self._select('cloudcasts', 'key', key)
+        if row is None:
+            return None
+        track = json.loads(row[1], object_hook=model_json_decoder)
+        return Entry(track, row[2], row[3], row[4])
+
+    def put_track(self, key, track, etag=None, last_modified=None):
+        self._replace('cloudcasts', (
+            key, json.dumps(track, cls=ModelJSONEncoder),
+            etag, last_modified, time.time()))
+
+    def put_tracks(self, tracks):
+        """Store many tracks in one transaction
+
+        :param tracks: iterable of ``(key, track)``
+        """
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO cloudcasts VALUES (?, ?, ?, ?, ?)',
+                [(key, json.dumps(track, cls=ModelJSONEncoder), None, None,
+                  now) for key, track in tracks])
+
+    def touch_track(self, key):
+        with self._lock, self._db:
+            self._db.execute(
+                'UPDATE cloudcasts SET fetched = ? WHERE key = ?',
+                (time.time(), key))
+
+    def get_feed(self, url):
+        row = self._select('feeds', 'url', url)
+        if row is None:
+            return None
+        items = json.loads(row[1], object_hook=model_json_decoder)
+        return Entry(items, row[2], row[3], row[4])
+
+    def put_feed(self, url, items, etag=None, last_modified=None):
+        self._replace('feeds', (
+            url, json.dumps(items, cls=ModelJSONEncoder),
+            etag, last_modified, time.time()))
+
+    def get_pictures(self, uris):
+        """Picture sources of the given cloudcast and user uris
+
+        :return: dict mapping the uris with a picture to its source
+        """
+        uris = list(uris)
+        pictures = {}
+        for start in range(0, len(uris), MAX_PARAMETERS):
+            chunk = uris[start:start + MAX_PARAMETERS]
+            with self._lock:
+                rows = self._db.execute(
+                    'SELECT uri, source FROM pictures WHERE uri IN (%s)' %
+                    ', '.join('?' * len(chunk)), chunk).fetchall()
+            for uri, source in rows:
+                source = json.loads(source)
+                pictures[uri] = tuple(source) if isinstance(
+                    source, list) else source
+        return pictures
+
+    def put_pictures(self, pictures):
+        """Store many picture sources in one transaction
+
+        :param pictures: iterable of ``(uri, source)``
+        """
+        now = time.time()
+        rows = [(uri, json.dumps(source), now) for uri, source in pictures]
+        if not rows:
+            return
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO pictures VALUES (?, ?, ?)', rows)
+
+    def touch_feed(self, url):
+        with self._lock, self._db:
+            self._db.execute(
+                'UPDATE feeds SET fetched = ? WHERE url = ?',
+                (time.time(), url))
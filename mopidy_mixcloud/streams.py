@@ -0,0 +1,160 @@
+from __future__ import unicode_literals
+
+import logging
+import re
+import threading
+import time
+from urlparse import parse_qs, urlparse
+
+from .cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+# Query parameters CDNs commonly use for the absolute expiry of signed URLs
+EXPIRY_PARAMS = ('exp', 'expires', 'Expires', 'expiry', 'e')
+# Akamai style tokens embed the expiry as exp=<ts> or exp~<ts>
+EXPIRY_TOKEN_RE = re.compile(r'(?:^|[~&])exp[=~](\d{9,11})')
+
+
+def stream_expiry(url):
+    """Return the expiry timestamp encoded in a signed stream URL
+
+    :param url: resolved stream url
+    :return: unix timestamp or ``None`` when the url carries no expiry
+    """
+    query = parse_qs(urlparse(url).query)
+    for name in EXPIRY_PARAMS:
+        for value in query.get(name, []):
+            if value.isdigit():
+                return int(value)
+    for values in query.values():
+        for value in values:
+            match = EXPIRY_TOKEN_RE.search(value)
+            if match:
+                return int(match.group(1))
+    return None
+
+
+class StreamUrlCache(object):
+    """Resolved stream urls keyed by cloudcast key.
+
+    Entries live until shortly before the expiry encoded in the url, or for
+    ``ttl`` seconds when the url does not carry one.
+
+    :param ttl: lifetime of urls without an encoded expiry
+    :param margin: seconds before the expiry at which a url is dropped
+    """
+
+    def __init__(self, maxsize=256, ttl=600, margin=30, timer=time.time):
+        self.ttl = ttl
+        self.margin = margin
+        self.timer = timer
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl, timer=timer)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def put(self, key, url):
+        if not url:
+            return
+        ttl = self.ttl
+        expires = stream_expiry(url)
+        if expires is not None:
+            ttl = expires - self.margin - self.timer()
+            if ttl <= 0:
+                logger.debug('Not caching stream for %s, expires soon', key)
+                return
+        self._cache.set(key, url, ttl=ttl)
+
+    def invalidate(self, key):
+        return self._cache.invalidate(key)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class StreamPrefetcher(object):
+    """Resolve stream urls of upcoming tracks ahead of playback.
+
+    Resolved urls go into ``streams`` so :meth:`translate_uri` finds them.
+    ``hits`` counts prefetched urls that were played, ``wasted`` counts
+    prefetched urls that dropped out of the upcoming tracks unplayed.
+
+    :param resolve: callable mapping a cloudcast key to a stream url
+    :param streams: :class:`StreamUrlCache` receiving the results
+    :param depth: number of upcoming tracks to resolve
+    :param workers: size of the resolving thread pool
+    """
+
+    def __init__(self, resolve, streams, depth=2, workers=2):
+        self.resolve = resolve
+        self.streams = streams
+        self.depth = depth
+        self.workers = workers
+        self.hits = 0
+        self.wasted = 0
+        self._pool = None
+        self._stopped = False
+        self._pending = set()
+        self._prefetched = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, keys):
+        """Prefetch the first ``depth`` of ``keys``, the upcoming tracks"""
+        keys = keys[:self.depth]
+        with self._lock:
+            if self._stopped:
+                return
+            dropped = self._prefetched.difference(keys)
+            self.wasted += len(dropped)
+            self._prefetched.difference_update(dropped)
+            todo = [key for key in keys if key not in self._pending and
+                    self.streams.get(key) is None]
+            if not todo:
+                return
+            self._pending.update(todo)
+            if self._pool is None:
+                from multiprocessing.pool import ThreadPool
+                self._pool = ThreadPool(processes=self.workers)
+            # submitted under the lock so stop() cannot drop the pool between
+            for key in todo:
+                self._pool.apply_async(self._prefetch, (key,))
+
+    def _prefetch(self, key):
+        try:
+            logger.debug('Prefetching stream for %s', key)
+            self.streams.put(key, self.resolve(key))
+            with self._lock:
+                self._prefetched.add(key)
+        except Exception as e:
+            logger.debug('Prefetching stream for %s failed: %s', key, e)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def played(self, key, cached):
+        """Record that ``key`` is being played, ``cached`` if its url came
+        from the cache"""
+        with self._lock:
+            if key in self._prefetched:
+                self._prefetched.discard(key)
+                if cached:
+                    self.hits += 1
+                else:
+                    self.wasted += 1
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'wasted': self.wasted,
+                'pending': len(self._pending),
+            }
@@ -0,0 +1,130 @@
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+FEED_URI = 'mixcloud:directory:feed'
+
+
+class FeedSync(object):
+    """Bounded local snapshot of the user feed, kept current incrementally.
+
+    :meth:`sync` fetches feed pages newest first only until it reaches a
+    cloudcast already in the snapshot and merges the new ones in front.
+    The first sync fills the snapshot up to ``max_tracks``. The snapshot
+    holds :class:`Cloudcast` records and is stored as `Track` objects.
+
+    :param client: :class:`MixcloudClient` to fetch pages with
+    :param max_tracks: number of tracks the snapshot holds
+    """
+
+    def __init__(self, client, max_tracks=500):
+        self.client = client
+        self.max_tracks = max_tracks
+        self.synced = 0
+        self.more = False
+        self._records = []
+        self._uris = set()
+        self._lock = threading.Lock()
+        self._syncing = threading.Lock()
+        self._load()
+
+    @property
+    def watermark(self):
+        """Uri of the newest cloudcast seen"""
+        return self._records[0].uri if self._records else None
+
+    def snapshot(self):
+        """The feed records, newest first"""
+        with self._lock:
+            return self._records
+
+    def is_stale(self):
+        return time.time() - self.synced >= self.client.cache_ttl
+
+    def sync(self):
+        """Fetch and merge the feed items newer than the watermark
+
+        :return: list of the new :class:`Cloudcast` records
+        """
+        if not self._syncing.acquire(False):
+            return []
+        try:
+            added, reached, more = self._fetch_new()
+            with self._lock:
+                self.synced = time.time()
+                if reached:
+                    added_uris = set(record.uri for record in added)
+                    records = added + [record for record in self._records
+                                       if record.uri not in added_uris]
+                else:
+                    # first sync, or too many new items to bridge the gap
+                    records = added
+                    self.more = more
+                if len(records) > self.max_tracks:
+                    self.more = True
+                self._records = records[:self.max_tracks]
+                self._uris = set(record.uri for record in self._records)
+        finally:
+            self._syncing.release()
+        logger.debug('Feed sync found %d new cloudcasts', len(added))
+        if added:
+            self._save()
+        return added
+
+    def sync_later(self):
+        """Run :meth:`sync` on the client's worker pool"""
+        self.client.pool.apply_async(self._try_sync)
+
+    def sync_if_stale(self):
+        if self.is_stale():
+            self.sync_later()
+
+    def _try_sync(self):
+        try:
+            self.sync()
+        except Exception as e:
+            logger.warn('Feed sync failed: %s' % e)
+
+    def _fetch_new(self):
+        """Fetch pages until reaching a known cloudcast
+
+        :return: tuple of the new records, whether a known cloudcast was
+            reached and whether the feed continues after the last page
+        """
+        added = []
+        seen = set()
+        url = self.client.feed_url()
+        pages = 0
+        while url and pages < self.client.feed_max_pages:
+            page = self.client.fetch_feed_page(url)
+            for record in page['data']:
+                if record.uri in self._uris:
+                    return added, True, True
+                if record.uri not in seen:
+                    seen.add(record.uri)
+                    added.append(record)
+            url = page['next']
+            pages += 1
+            if len(added) >= self.max_tracks:
+                break
+        return added, False, bool(url)
+
+    def _load(self):
+        store = self.client.store
+        entry = store.get_feed(FEED_URI) if store else None
+        if entry is not None:
+            self._records = self.client.remember(entry.value['data'])
+            self._uris = set(record.uri for record in self._records)
+            self.more = bool(entry.value['next'])
+            self.synced = entry.fetched
+
+    def _save(self):
+        if self.client.store:
+            with self._lock:
+                page = {'data': self._records, 'next': self.more or None}
+            self.client.store_feed(FEED_URI, page)
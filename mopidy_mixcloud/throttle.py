@@ -0,0 +1,241 @@
+from __future__ import unicode_literals
+
+import logging
+import random
+import threading
+import time
+from email.utils import mktime_tz, parsedate_tz
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Share one in-flight call between concurrent callers of the same key.
+
+    ``calls`` counts executed calls, ``coalesced`` counts callers that
+    waited for another caller's result instead of issuing their own.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def do(self, key, func, *args):
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func(*args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'inflight': len(self._inflight),
+            }
+
+
+class TokenBucket(object):
+    """Blocking token bucket rate limiter with adaptive backoff.
+
+    :param rate: tokens added per second, ``0`` disables limiting
+    :param burst: bucket capacity
+    :param min_rate: floor the rate is reduced to after throttling
+
+    :meth:`throttled` halves the current rate and pauses the bucket for the
+    server's ``Retry-After``; every successful response then recovers the
+    rate by a tenth of the configured rate.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=0.1, timer=time.time,
+                 sleep=time.sleep):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = float(burst or rate or 1)
+        self.min_rate = min_rate
+        self.timer = timer
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.requests = 0
+        self.throttles = 0
+        self.waited = 0.0
+        self._blocked_until = 0
+        self._last = timer()
+        self._started = self._last
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.burst, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        with self._lock:
+            now = self.timer()
+            self.requests += 1
+            delay = self._blocked_until - now
+            if self.max_rate:
+                self._refill(now)
+                self.tokens -= 1
+                if self.tokens < 0:
+                    delay = max(delay, -self.tokens / self.rate)
+            delay = max(delay, 0)
+            self.waited += delay
+        if delay > 0:
+            logger.debug('Rate limited, waiting %.2fs', delay)
+            self.sleep(delay)
+
+    def throttled(self, retry_after=None):
+        """Back off after a 429 response"""
+        with self._lock:
+            self.throttles += 1
+            if self.max_rate:
+                self.rate = max(self.min_rate, self.rate / 2)
+            delay = retry_after if retry_after is not None else 1.0 / (
+                self.rate or 1)
+            self._blocked_until = max(
+                self._blocked_until, self.timer() + delay)
+        logger.info('Mixcloud API throttled us, backing off %.1fs', delay)
+
+    def succeeded(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(
+                    self.max_rate, self.rate + self.max_rate / 10)
+
+    def stats(self):
+        with self._lock:
+            elapsed = max(self.timer() - self._started, 1e-9)
+            return {
+                'requests': self.requests,
+                'request_rate': self.requests / elapsed,
+                'rate_limit': self.rate,
+                'throttles': self.throttles,
+                'waited': self.waited,
+            }
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit is open"""
+
+
+class CircuitBreaker(object):
+    """Fail fast while an endpoint keeps failing.
+
+    After ``threshold`` consecutive failures the circuit opens and
+    :meth:`allow` refuses requests for ``reset`` seconds. Then a single
+    probe request is let through (half-open): its success closes the
+    circuit, its failure opens it again.
+
+    ``state`` is ``0`` closed, ``1`` half-open or ``2`` open, so it can be
+    exported as a gauge.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, threshold=5, reset=30, timer=time.time):
+        self.threshold = threshold
+        self.reset = reset
+        self.timer = timer
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opens = 0
+        self.rejected = 0
+        self._opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request may be sent now"""
+        with self._lock:
+            if self.state == self.OPEN and \
+                    self.timer() - self._opened >= self.reset:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED or (
+                    self.state == self.HALF_OPEN and not self._probing):
+                self._probing = self.state == self.HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def succeeded(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info('Mixcloud is answering again, closing circuit')
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.OPEN or (
+                    self.state == self.CLOSED and
+                    self.failures < self.threshold):
+                return
+            self.state = self.OPEN
+            self.opens += 1
+            self._opened = self.timer()
+        logger.warn('Mixcloud keeps failing, pausing requests for %ds',
+                    self.reset)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'opens': self.opens,
+                'rejected': self.rejected,
+            }
+
+
+def backoff_delay(attempt, base, cap=30, random=random.random):
+    """Seconds to wait before retry number ``attempt`` (from 0): a random
+    share of the exponential backoff, so clients failing together do not
+    retry together"""
+    return random() * min(cap, base * 2 ** attempt)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a ``Retry-After`` header, ``None`` if unknown"""
+    if not value:
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0, mktime_tz(date) - time.time())
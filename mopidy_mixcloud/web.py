@@ -0,0 +1,56 @@
+from __future__ import unicode_literals
+
+import logging
+import os
+
+from tornado import gen, httpclient, web
+
+from . import MixcloudExtension
+from .images import THUMBNAILER, ThumbnailCache, image_sizes
+
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailHandler(web.RequestHandler):
+    """Serve Mixcloud thumbnails from the disk cache, fetching misses from
+    the thumbnailer without blocking the HTTP server"""
+
+    def initialize(self, cache, sizes):
+        self.cache = cache
+        self.sizes = sizes
+
+    @gen.coroutine
+    def get(self, width, height, path):
+        if width != height or int(width) not in self.sizes or '..' in path:
+            raise web.HTTPError(404)
+        key = '%sx%s/%s' % (width, height, path)
+        cached = self.cache.get(key)
+        if cached is None:
+            try:
+                response = yield httpclient.AsyncHTTPClient().fetch(
+                    THUMBNAILER + key, request_timeout=20)
+            except httpclient.HTTPError as e:
+                logger.debug('Fetching thumbnail %s failed: %s', key, e)
+                raise web.HTTPError(e.code if e.code != 599 else 502)
+            content_type = response.headers.get(
+                'Content-Type', 'application/octet-stream')
+            cached = response.body, content_type
+            self.cache.put(key, *cached)
+        data, content_type = cached
+        self.set_header('Content-Type', content_type)
+        self.set_header('Cache-Control', 'public, max-age=604800')
+        self.write(data)
+
+
+def thumbnail_app(config, core):
+    """``http:app`` factory of the thumbnail cache, empty unless
+    ``thumbnail_cache_size`` is set"""
+    megabytes = config['mixcloud'].get('thumbnail_cache_size')
+    if not megabytes:
+        return []
+    cache = ThumbnailCache(
+        os.path.join(MixcloudExtension.get_cache_dir(config), 'thumbnails'),
+        max_bytes=megabytes * 1024 * 1024)
+    return [(r'/images/(\d+)x(\d+)/(.+)', ThumbnailHandler,
+             {'cache': cache, 'sizes': image_sizes(config['mixcloud'])})]
@@ -25,9 +25,9 @@ setup(
     include_package_data=True,
     install_requires=[
         'setuptools',
-        'Mopidy >= 1.0',
+        'Mopidy >= 1.1',
         'Pykka >= 1.1',
-        'requests >= 2.0.0',
+        'requests >= 2.4.0',
     ],
     entry_points={
         'mopidy.ext': [
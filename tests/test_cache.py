@@ -0,0 +1,174 @@
+from __future__ import unicode_literals
+
+from mopidy_mixcloud.cache import LRUCache, cache
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=0)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_updating_entry_refreshes_its_position():
+    cache = LRUCache(maxsize=2, ttl=0)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('a', 10)
+    cache.set('c', 3)
+
+    assert cache.get('a') == 10
+    assert 'b' not in cache
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = LRUCache(ttl=10, timer=clock)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=20)
+
+    clock.now += 10
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    assert cache.stats()['expirations'] == 1
+
+    clock.now += 10
+    assert 'b' not in cache
+
+
+def test_zero_ttl_never_expires():
+    clock = Clock()
+    cache = LRUCache(ttl=0, timer=clock)
+    cache.set('a', 1)
+
+    clock.now += 10 ** 6
+    assert cache.get('a') == 1
+    assert cache.expires_at('a') == 0
+
+
+def test_get_stale_serves_expired_entries():
+    clock = Clock()
+    cache = LRUCache(ttl=10, timer=clock)
+    cache.set('a', 1)
+    assert cache.get_stale('a') == (1, True)
+
+    clock.now += 10
+    assert cache.get_stale('a') == (1, False)
+    assert cache.get_stale('missing', 'default') == ('default', False)
+    stats = cache.stats()
+    assert (stats['hits'], stats['stale_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_get_drops_stale_entry():
+    clock = Clock()
+    cache = LRUCache(ttl=10, timer=clock)
+    cache.set('a', 1)
+    clock.now += 10
+
+    assert cache.get('a') is None
+    assert cache.get_stale('a') == (None, False)
+    assert len(cache) == 0
+
+
+def test_invalidate_and_clear():
+    cache = LRUCache()
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    assert cache.invalidate('a')
+    assert not cache.invalidate('a')
+    cache.clear()
+    assert len(cache) == 0
+
+
+class Client(object):
+
+    cache_size = 2
+    cache_ttl = 10
+
+    def __init__(self):
+        self.calls = []
+        self.revalidations = []
+
+    @cache()
+    def get(self, key):
+        self.calls.append(key)
+        return '%s-%d' % (key, len(self.calls))
+
+    @cache(stale=True)
+    def get_stale(self, key):
+        self.calls.append(key)
+        return '%s-%d' % (key, len(self.calls))
+
+    def revalidate(self, key, func, *args):
+        self.revalidations.append(key)
+        func(*args)
+
+
+def test_decorator_caches_per_instance():
+    first, second = Client(), Client()
+
+    assert first.get('a') == 'a-1'
+    assert first.get('a') == 'a-1'
+    assert second.get('a') == 'a-1'
+    assert first.calls == second.calls == ['a']
+    assert Client.get.cache_for(first) is not Client.get.cache_for(second)
+
+
+def test_decorator_uses_instance_bounds():
+    client = Client()
+    store = Client.get.cache_for(client)
+
+    assert (store.maxsize, store.ttl) == (2, 10)
+    for key in 'abc':
+        client.get(key)
+    assert client.get('a') == 'a-4'
+
+
+def test_decorator_refresh_replaces_one_key():
+    client = Client()
+    client.get('a')
+    client.get('b')
+
+    assert Client.get.refresh(client, 'a') == 'a-3'
+    assert client.get('a') == 'a-3'
+    assert client.get('b') == 'b-2'
+
+
+def test_decorator_passes_unhashable_arguments_through():
+    client = Client()
+
+    client.get(['a'])
+    client.get(['a'])
+    assert client.calls == [['a'], ['a']]
+    assert len(Client.get.cache_for(client)) == 0
+
+
+def test_decorator_serves_stale_value_while_revalidating():
+    clock = Clock()
+    client = Client()
+    client.__dict__['_cache_get_stale'] = LRUCache(ttl=10, timer=clock)
+
+    assert client.get_stale('a') == 'a-1'
+    assert client.revalidations == []
+
+    clock.now += 10
+    assert client.get_stale('a') == 'a-1'
+    assert client.revalidations == [('_cache_get_stale', 'a')]
+    assert client.get_stale('a') == 'a-2'
+    assert client.calls == ['a', 'a']
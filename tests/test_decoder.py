@@ -0,0 +1,50 @@
+from __future__ import unicode_literals
+
+import base64
+import json
+
+import pytest
+
+from mopidy_mixcloud import decoder
+from mopidy_mixcloud.decoder import (
+    PLAY_INFO_END, PLAY_INFO_START, PlayInfoDecoder, find_play_info)
+
+
+def encode(info, key=decoder.MAGIC_KEY):
+    data = json.dumps(info).encode('utf-8')
+    stream = (key * (len(data) // len(key) + 1))[:len(data)]
+    return base64.b64encode(bytes(bytearray(
+        a ^ b for a, b in zip(bytearray(data), bytearray(stream)))))
+
+
+def test_decode_round_trip():
+    info = {'stream_url': 'https://stream.mixcloud.com/c/m4a/64/x.m4a'}
+    assert PlayInfoDecoder().decode(encode(info)) == info
+
+
+def test_decode_with_custom_key():
+    info = {'stream_url': 'http://example.com/a.mp3'}
+    assert PlayInfoDecoder(b'key').decode(encode(info, b'key')) == info
+
+
+@pytest.mark.parametrize('size', [0, 1, 63, 64, 5000])
+def test_xor_is_its_own_inverse(size):
+    data = bytes(bytearray(i % 256 for i in range(size)))
+    dec = PlayInfoDecoder()
+    assert dec.xor(dec.xor(data)) == data
+
+
+def test_find_play_info_across_chunks():
+    encoded = encode({'stream_url': 'x'})
+    page = b'<html>' + PLAY_INFO_START + encoded + PLAY_INFO_END + b'x' * 100
+    chunks = [page[i:i + 7] for i in range(0, len(page), 7)]
+
+    value, read = find_play_info(iter(chunks))
+    assert value == encoded
+    assert read < len(page)
+
+
+def test_find_play_info_gives_up():
+    value, read = find_play_info(iter([b'x' * 100] * 10), max_bytes=300)
+    assert value is None
+    assert read == 300
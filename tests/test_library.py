@@ -0,0 +1,56 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from mopidy_mixcloud.library import (
+    USER_FOLDERS, generate_uri, new_folder, parse_uri)
+
+
+@pytest.mark.parametrize('path, offset', [
+    (['feed'], 0),
+    (['feed'], 40),
+    (['explore'], 0),
+    (['explore', 'hot'], 0),
+    (['cloudcasts', 'dj-1/favorites'], 0),
+    (['cloudcasts', 'dj-1/favorites'], 100),
+    (['users', 'dj-1/following'], 50),
+    (['playlists', 'dj-1/playlists'], 0),
+    (['user', 'dj-1'], 0),
+    (['cloudcasts', 'dj-1/playlists/late-night/cloudcasts'], 20),
+])
+def test_uris_round_trip(path, offset):
+    kind, path = path[0], '/'.join(path[1:])
+
+    assert parse_uri(generate_uri([kind, path], offset)) == (
+        kind, path, offset)
+
+
+def test_first_page_has_no_offset():
+    assert generate_uri(['feed']) == 'mixcloud:directory:feed'
+    assert generate_uri(['feed'], 20) == 'mixcloud:directory:feed@20'
+
+
+def test_at_and_unicode_in_names_round_trip():
+    path = 'dj@home/caf\xe9 \u2013 sets'
+
+    uri = generate_uri(['user', path], 40)
+
+    assert '@' not in uri[:uri.rindex('@')]
+    assert parse_uri(uri) == ('user', path, 40)
+
+
+def test_slashes_separate_the_api_path():
+    uri = generate_uri(['cloudcasts', 'dj-1/favorites'])
+
+    assert uri == 'mixcloud:directory:cloudcasts/dj-1/favorites'
+    assert parse_uri(uri) == ('cloudcasts', 'dj-1/favorites', 0)
+
+
+def test_user_folders_point_at_their_sections():
+    folders = [new_folder(name, [kind, 'dj-1/' + section])
+               for name, kind, section, _ in USER_FOLDERS]
+
+    assert [parse_uri(folder.uri)[1] for folder in folders] == [
+        'dj-1/favorites', 'dj-1/listen-later', 'dj-1/cloudcasts',
+        'dj-1/following', 'dj-1/playlists']
+    assert folders[0].name == 'Favorites'
@@ -0,0 +1,122 @@
+from __future__ import unicode_literals
+
+import mock
+
+import pytest
+
+from mopidy_mixcloud.mixcloud import MixcloudClient
+from mopidy_mixcloud.throttle import (
+    CircuitBreaker, CircuitOpenError, TokenBucket)
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class Response(object):
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class Session(object):
+    """Answers requests in turn, each taking ``latency`` seconds"""
+
+    def __init__(self, clock, answers, latency=1):
+        self.clock = clock
+        self.answers = list(answers)
+        self.latency = latency
+        self.timeouts = []
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        self.timeouts.append(timeout)
+        self.clock.now += self.latency
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    with mock.patch('mopidy_mixcloud.mixcloud.time') as time:
+        time.time.side_effect = clock
+        time.sleep.side_effect = clock.sleep
+        with mock.patch('mopidy_mixcloud.mixcloud.backoff_delay',
+                        lambda attempt, base: base * 2 ** attempt):
+            yield clock
+
+
+def client(clock, answers, **config):
+    config.setdefault('username', 'user')
+    client = MixcloudClient(config)
+    client.limiter = TokenBucket(0, timer=clock, sleep=clock.sleep)
+    client.breakers['api'] = CircuitBreaker(
+        config.get('circuit_threshold', 5), 30, timer=clock)
+    client._http_client = Session(clock, answers)
+    return client
+
+
+def test_request_retries_server_errors(clock):
+    remote = client(clock, [Response(500), Response(503), Response(200)])
+
+    assert remote._request('http://api/').status_code == 200
+    assert len(remote.http_client.timeouts) == 3
+    assert remote.breakers['api'].failures == 0
+
+
+def test_request_gives_up_at_the_deadline(clock):
+    remote = client(clock, [Response(500)] * 6, http_retries=5,
+                    http_backoff=2000, http_connect_timeout=3000,
+                    http_read_timeout=10000)
+
+    assert remote._request('http://api/').status_code == 500
+    # retries read with what is left of the first attempt's 13 seconds
+    assert remote.http_client.timeouts == [(3, 10), (3, 7), (3, 2)]
+    assert clock.now == 1009
+
+
+def test_request_raises_last_connection_error(clock):
+    remote = client(clock, [IOError('refused')] * 3)
+
+    with pytest.raises(IOError):
+        remote._request('http://api/')
+    assert len(remote.http_client.timeouts) == 3
+
+
+def test_request_waits_for_retry_after(clock):
+    remote = client(clock, [
+        Response(429, {'Retry-After': '2'}), Response(200)])
+
+    assert remote._request('http://api/').status_code == 200
+    assert clock.now == 1004
+    assert remote.limiter.throttles == 1
+
+
+def test_request_returns_throttled_response_past_the_deadline(clock):
+    remote = client(clock, [Response(429, {'Retry-After': '60'})])
+
+    assert remote._request('http://api/').status_code == 429
+    assert len(remote.http_client.timeouts) == 1
+
+
+def test_request_fails_fast_while_circuit_is_open(clock):
+    remote = client(clock, [Response(500)] * 2, http_retries=1,
+                    circuit_threshold=2)
+
+    assert remote._request('http://api/').status_code == 500
+    with pytest.raises(CircuitOpenError):
+        remote._request('http://api/')
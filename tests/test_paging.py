@@ -0,0 +1,106 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from mopidy_mixcloud.paging import PagedList
+
+
+def source(length):
+    calls = []
+
+    def fetch(offset, limit):
+        calls.append((offset, limit))
+        end = min(offset + limit, length)
+        return {
+            'data': list(range(offset, end)),
+            'next': 'next' if end < length else None,
+        }
+
+    return fetch, calls
+
+
+def test_reads_items_across_pages():
+    fetch, calls = source(25)
+    items = PagedList(fetch, page_size=10)
+
+    assert list(items) == list(range(25))
+    assert items[12] == 12
+    assert items[3:14] == list(range(3, 14))
+    assert calls == [(0, 10), (10, 10), (20, 10)]
+
+
+def test_index_beyond_end_raises():
+    fetch, calls = source(5)
+    items = PagedList(fetch, page_size=10)
+
+    with pytest.raises(IndexError):
+        items[5]
+    assert items.length == 5
+    with pytest.raises(IndexError):
+        items[50]
+    assert calls == [(0, 10)]
+
+
+def test_slices_stop_at_the_end_of_the_list():
+    fetch, calls = source(12)
+    items = PagedList(fetch, page_size=10)
+
+    assert items[8:40] == [8, 9, 10, 11]
+    assert items[20:30] == []
+    assert not items.has_more(12)
+    assert calls == [(0, 10), (10, 10)]
+
+
+def test_unsupported_slices():
+    fetch, _ = source(10)
+    items = PagedList(fetch)
+
+    for index in (slice(0, None), slice(-2, 5), slice(0, 5, 2)):
+        with pytest.raises(ValueError):
+            items[index]
+
+
+def test_only_window_pages_are_kept():
+    fetch, calls = source(100)
+    items = PagedList(fetch, page_size=10, window=2)
+
+    assert items[5] == 5
+    assert items[15] == 15
+    assert items[25] == 25
+    assert items[6] == 6
+    assert calls == [(0, 10), (10, 10), (20, 10), (0, 10)]
+
+
+def test_skipped_items_keep_api_positions():
+    fetch, _ = source(20)
+
+    def parsed(offset, limit):
+        page = fetch(offset, limit)
+        page['data'] = [None if item % 3 == 0 else item * 10
+                        for item in page['data']]
+        return page
+
+    items = PagedList(parsed, page_size=10)
+
+    assert items[0:5] == [10, 20, 40]
+    assert items[4] == 40
+    with pytest.raises(IndexError):
+        items[3]
+    assert list(items)[-2:] == [170, 190]
+
+
+def test_fetch_many_batches_later_pages():
+    fetch, calls = source(45)
+    batches = []
+
+    def fetch_many(requests):
+        batches.append(requests)
+        return [IOError('failed') if offset == 20 else fetch(offset, limit)
+                for offset, limit in requests]
+
+    items = PagedList(fetch, page_size=10, window=4, fetch_many=fetch_many)
+
+    assert list(items) == list(range(45))
+    assert batches == [[(10, 10), (20, 10), (30, 10), (40, 10)]]
+    # the failed page is fetched on its own
+    assert calls == [(0, 10), (10, 10), (30, 10), (40, 10), (20, 10)]
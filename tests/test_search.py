@@ -0,0 +1,59 @@
+from __future__ import unicode_literals
+
+from mopidy_mixcloud.records import Cloudcast, User
+from mopidy_mixcloud.search import SearchIndex, tokenize
+
+
+def cloudcast(slug, name, user='DJ Test', tags=()):
+    return Cloudcast(User('/dj/', user), slug, name, tags=tags)
+
+
+def test_tokenize_drops_case_and_accents():
+    assert tokenize('Caf\xe9 del Mar \u2013 Ibiza!') == [
+        'cafe', 'del', 'mar', 'ibiza']
+    assert tokenize(None) == []
+
+
+def test_last_term_matches_as_prefix():
+    index = SearchIndex()
+    index.add(cloudcast('a/', 'Deep House Session'))
+    index.add(cloudcast('b/', 'Housewarming Party'))
+    index.add(cloudcast('c/', 'Techno Night'))
+
+    assert sorted(index.search('hous')) == [
+        'mixcloud:/dj/a/', 'mixcloud:/dj/b/']
+    assert index.search('deep hous') == ['mixcloud:/dj/a/']
+    assert index.search('hous deep') == []
+    assert index.search('hous', exact=True) == []
+
+
+def test_results_are_ranked_by_field():
+    index = SearchIndex()
+    index.add(cloudcast('a/', 'Mix', tags=['jazz']))
+    index.add(cloudcast('b/', 'Jazz Mix'))
+    index.add(cloudcast('c/', 'Mix'), description='some jazz inside')
+
+    assert index.search('jazz') == [
+        'mixcloud:/dj/b/', 'mixcloud:/dj/a/', 'mixcloud:/dj/c/']
+    assert index.search('jazz', limit=1) == ['mixcloud:/dj/b/']
+
+
+def test_reindexing_replaces_terms():
+    index = SearchIndex()
+    index.add(cloudcast('a/', 'Old Name'))
+    index.add(cloudcast('a/', 'New Name'))
+
+    assert index.search('old') == []
+    assert index.search('new') == ['mixcloud:/dj/a/']
+    assert len(index) == 1
+
+
+def test_oldest_cloudcasts_are_dropped():
+    index = SearchIndex(max_tracks=2)
+    for slug in ('a/', 'b/', 'c/'):
+        index.add(cloudcast(slug, 'Mix ' + slug[0]))
+
+    assert len(index) == 2
+    assert sorted(index.search('mix')) == [
+        'mixcloud:/dj/b/', 'mixcloud:/dj/c/']
+    assert index.search('a') == []
@@ -0,0 +1,161 @@
+from __future__ import unicode_literals
+
+import sqlite3
+
+import mock
+
+from mopidy.models import Artist, Track
+
+import pytest
+
+from mopidy_mixcloud import store
+from mopidy_mixcloud.store import MetadataStore
+
+
+DAY = 24 * 3600
+
+
+@pytest.fixture
+def clock():
+    with mock.patch('mopidy_mixcloud.store.time') as time:
+        time.time.return_value = 1000.0 * DAY
+        yield time.time
+
+
+@pytest.fixture
+def path(tmpdir):
+    return str(tmpdir.join('metadata.db'))
+
+
+def track(key):
+    return Track(uri='mixcloud:' + key, name='Mix ' + key,
+                 artists=[Artist(name='DJ')], length=3600000)
+
+
+def test_tracks_and_validators_survive_reopening(clock, path):
+    metadata = MetadataStore(path)
+    metadata.put_track('/dj/mix/', track('/dj/mix/'), '"v1"', 'Mon')
+    metadata.close()
+
+    entry = MetadataStore(path).get_track('/dj/mix/')
+
+    assert entry.value == track('/dj/mix/')
+    assert (entry.etag, entry.last_modified) == ('"v1"', 'Mon')
+    assert entry.fetched == clock.return_value
+
+
+def test_missing_rows_are_none(path):
+    metadata = MetadataStore(path)
+
+    assert metadata.get_track('/dj/missing/') is None
+    assert metadata.get_feed('http://api/feed/') is None
+    assert metadata.get_pictures(['mixcloud:/dj/missing/']) == {}
+
+
+def test_feeds_keep_their_items(path):
+    metadata = MetadataStore(path)
+    page = {'data': [['/dj/mix/', 'Mix']], 'next': None}
+    metadata.put_feed('http://api/feed/', page, etag='"f"')
+
+    entry = metadata.get_feed('http://api/feed/')
+
+    assert entry.value == page
+    assert entry.etag == '"f"'
+
+
+def test_touch_restarts_the_age(clock, path):
+    metadata = MetadataStore(path)
+    metadata.put_track('/dj/mix/', track('/dj/mix/'))
+    metadata.put_feed('http://api/feed/', {'data': []})
+    clock.return_value += 600
+
+    metadata.touch_track('/dj/mix/')
+    metadata.touch_feed('http://api/feed/')
+
+    assert metadata.get_track('/dj/mix/').fetched == clock.return_value
+    assert metadata.get_feed('http://api/feed/').fetched == clock.return_value
+
+
+def test_pictures_keep_tuples_and_urls(path):
+    metadata = MetadataStore(path)
+    metadata.put_pictures([
+        ('mixcloud:/dj/mix/', ('extaudio', 'mix.jpg')),
+        ('mixcloud:/dj/', 'https://example.com/dj.jpg')])
+
+    assert metadata.get_pictures(
+        ['mixcloud:/dj/mix/', 'mixcloud:/dj/', 'mixcloud:/other/']) == {
+        'mixcloud:/dj/mix/': ('extaudio', 'mix.jpg'),
+        'mixcloud:/dj/': 'https://example.com/dj.jpg'}
+
+
+def test_pictures_are_read_in_chunks(path):
+    metadata = MetadataStore(path)
+    uris = ['mixcloud:/dj/mix-%d/' % i for i in range(1200)]
+    metadata.put_pictures([(uri, uri + '.jpg') for uri in uris])
+
+    assert len(metadata.get_pictures(uris)) == 1200
+
+
+def test_put_tracks_stores_all_at_once(path):
+    metadata = MetadataStore(path)
+    keys = ['/dj/mix-%d/' % i for i in range(3)]
+
+    metadata.put_tracks([(key, track(key)) for key in keys])
+
+    assert [metadata.get_track(key).value for key in keys] == [
+        track(key) for key in keys]
+
+
+def test_opening_prunes_rows_older_than_max_age(clock, path):
+    metadata = MetadataStore(path)
+    metadata.put_track('/dj/old/', track('/dj/old/'))
+    metadata.put_feed('http://api/old/', {'data': []})
+    metadata.put_pictures([('mixcloud:/dj/old/', 'old.jpg')])
+    clock.return_value += 20 * DAY
+    metadata.put_track('/dj/new/', track('/dj/new/'))
+    metadata.put_pictures([('mixcloud:/dj/new/', 'new.jpg')])
+    metadata.close()
+    clock.return_value += 20 * DAY
+
+    metadata = MetadataStore(path, max_age=30 * DAY)
+
+    assert metadata.get_track('/dj/old/') is None
+    assert metadata.get_feed('http://api/old/') is None
+    assert metadata.get_track('/dj/new/') is not None
+    assert metadata.get_pictures(
+        ['mixcloud:/dj/old/', 'mixcloud:/dj/new/']) == {
+        'mixcloud:/dj/new/': 'new.jpg'}
+
+
+def test_no_max_age_keeps_everything(clock, path):
+    metadata = MetadataStore(path)
+    metadata.put_track('/dj/old/', track('/dj/old/'))
+    metadata.close()
+    clock.return_value += 1000 * DAY
+
+    assert MetadataStore(path, max_age=0).get_track('/dj/old/') is not None
+
+
+def test_prune_counts_deleted_rows(clock, path):
+    metadata = MetadataStore(path)
+    metadata.put_track('/dj/old/', track('/dj/old/'))
+    metadata.put_pictures([('mixcloud:/dj/old/', 'old.jpg')])
+    clock.return_value += 2 * DAY
+
+    assert metadata.prune(DAY) == 2
+    assert metadata.prune(DAY) == 0
+
+
+def test_older_schema_is_reset(path):
+    db = sqlite3.connect(path)
+    db.executescript(
+        'CREATE TABLE pictures (uri TEXT PRIMARY KEY, source TEXT NOT NULL);'
+        "INSERT INTO pictures VALUES ('mixcloud:/dj/', '\"dj.jpg\"');"
+        'PRAGMA user_version = %d;' % (store.SCHEMA_VERSION - 1))
+    db.close()
+
+    metadata = MetadataStore(path)
+    metadata.put_pictures([('mixcloud:/dj/mix/', 'mix.jpg')])
+
+    assert metadata.get_pictures(['mixcloud:/dj/', 'mixcloud:/dj/mix/']) == {
+        'mixcloud:/dj/mix/': 'mix.jpg'}
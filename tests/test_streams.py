@@ -0,0 +1,86 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from mopidy_mixcloud.streams import StreamUrlCache, stream_expiry
+
+
+NOW = 1500000000
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = float(NOW)
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize('url, expiry', [
+    ('https://stream.mixcloud.com/a.m4a?exp=1500000600&sig=x', 1500000600),
+    ('https://stream.mixcloud.com/a.m4a?Expires=1500000600', 1500000600),
+    ('https://stream.mixcloud.com/a.m4a?e=1500000600', 1500000600),
+    ('https://stream.mixcloud.com/a.m4a?__gda__=st=1~exp=1500000600~hmac=ab',
+     1500000600),
+    ('https://stream.mixcloud.com/a.m4a?hdnts=exp~1500000600', 1500000600),
+    ('https://stream.mixcloud.com/a.m4a', None),
+    ('https://stream.mixcloud.com/a.m4a?exp=soon', None),
+    ('https://stream.mixcloud.com/a.m4a?token=exp=12', None),
+])
+def test_stream_expiry(url, expiry):
+    assert stream_expiry(url) == expiry
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_url_without_expiry_lives_for_ttl(clock):
+    streams = StreamUrlCache(ttl=600, timer=clock)
+    streams.put('/dj/mix/', 'https://stream.mixcloud.com/a.m4a')
+
+    clock.now += 599
+    assert streams.get('/dj/mix/') == 'https://stream.mixcloud.com/a.m4a'
+    clock.now += 1
+    assert streams.get('/dj/mix/') is None
+
+
+def test_url_lives_until_margin_before_its_expiry(clock):
+    streams = StreamUrlCache(ttl=60, margin=30, timer=clock)
+    url = 'https://stream.mixcloud.com/a.m4a?exp=%d' % (NOW + 3600)
+    streams.put('/dj/mix/', url)
+
+    clock.now += 3569
+    assert streams.get('/dj/mix/') == url
+    clock.now += 1
+    assert streams.get('/dj/mix/') is None
+
+
+def test_url_expiring_within_margin_is_not_cached(clock):
+    streams = StreamUrlCache(margin=30, timer=clock)
+
+    streams.put('/dj/mix/', 'https://stream.mixcloud.com/a.m4a?exp=%d' % (
+        NOW + 30))
+
+    assert streams.get('/dj/mix/') is None
+
+
+def test_empty_url_is_not_cached(clock):
+    streams = StreamUrlCache(timer=clock)
+
+    streams.put('/dj/mix/', None)
+
+    assert streams.get('/dj/mix/') is None
+
+
+def test_invalidate_and_bound(clock):
+    streams = StreamUrlCache(maxsize=2, timer=clock)
+    for key in ('/dj/a/', '/dj/b/', '/dj/c/'):
+        streams.put(key, 'https://stream.mixcloud.com%s.m4a' % key)
+
+    assert streams.get('/dj/a/') is None
+    streams.invalidate('/dj/b/')
+    assert streams.get('/dj/b/') is None
+    assert streams.get('/dj/c/') == 'https://stream.mixcloud.com/dj/c/.m4a'
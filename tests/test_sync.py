@@ -0,0 +1,116 @@
+from __future__ import unicode_literals
+
+import collections
+
+from mopidy_mixcloud.sync import FeedSync
+
+
+Record = collections.namedtuple('Record', 'uri')
+
+
+class Client(object):
+    """Serves a feed of ``uris`` in pages of ``page_size``, newest first,
+    and records the offsets of the pages fetched"""
+
+    store = None
+    cache_ttl = 3600
+
+    def __init__(self, uris, page_size=2, max_pages=50):
+        self.uris = list(uris)
+        self.page_size = page_size
+        self.feed_max_pages = max_pages
+        self.fetched = []
+
+    def feed_url(self):
+        return 'feed@0'
+
+    def fetch_feed_page(self, url):
+        offset = int(url.split('@')[1])
+        self.fetched.append(offset)
+        end = offset + self.page_size
+        return {
+            'data': [Record(uri) for uri in self.uris[offset:end]],
+            'next': 'feed@%d' % end if end < len(self.uris) else None,
+        }
+
+    def publish(self, *uris):
+        self.uris[:0] = uris
+
+
+def uris(feed):
+    return [record.uri for record in feed.snapshot()]
+
+
+def test_first_sync_fills_the_snapshot():
+    client = Client(['m5', 'm4', 'm3', 'm2', 'm1'])
+    feed = FeedSync(client, max_tracks=10)
+
+    added = feed.sync()
+
+    assert [record.uri for record in added] == ['m5', 'm4', 'm3', 'm2', 'm1']
+    assert uris(feed) == ['m5', 'm4', 'm3', 'm2', 'm1']
+    assert feed.watermark == 'm5'
+    assert not feed.more
+
+
+def test_sync_stops_at_the_watermark():
+    client = Client(['m5', 'm4', 'm3', 'm2', 'm1'])
+    feed = FeedSync(client, max_tracks=10)
+    feed.sync()
+    client.publish('m7', 'm6')
+    client.fetched = []
+
+    added = feed.sync()
+
+    assert [record.uri for record in added] == ['m7', 'm6']
+    assert uris(feed) == ['m7', 'm6', 'm5', 'm4', 'm3', 'm2', 'm1']
+    assert client.fetched == [0, 2]
+
+
+def test_sync_without_news_fetches_one_page():
+    client = Client(['m3', 'm2', 'm1'])
+    feed = FeedSync(client, max_tracks=10)
+    feed.sync()
+    client.fetched = []
+
+    assert feed.sync() == []
+    assert client.fetched == [0]
+    assert uris(feed) == ['m3', 'm2', 'm1']
+
+
+def test_any_known_cloudcast_ends_the_sync():
+    client = Client(['m3', 'm2', 'm1'], page_size=1)
+    feed = FeedSync(client, max_tracks=10)
+    feed.sync()
+    # m1 shows up again ahead of m3, e.g. when it was reposted
+    client.publish('m4', 'm1')
+    client.fetched = []
+
+    feed.sync()
+
+    assert uris(feed) == ['m4', 'm3', 'm2', 'm1']
+    assert client.fetched == [0, 1]
+
+
+def test_snapshot_is_bounded():
+    client = Client(['m%d' % i for i in range(10, 0, -1)])
+    feed = FeedSync(client, max_tracks=4)
+
+    feed.sync()
+    client.publish('m12', 'm11')
+    feed.sync()
+
+    assert uris(feed) == ['m12', 'm11', 'm10', 'm9']
+    assert feed.more
+
+
+def test_gap_too_large_to_bridge_replaces_the_snapshot():
+    client = Client(['m2', 'm1'], max_pages=2)
+    feed = FeedSync(client, max_tracks=10)
+    feed.sync()
+    client.publish('m8', 'm7', 'm6', 'm5', 'm4', 'm3')
+
+    feed.sync()
+
+    assert uris(feed) == ['m8', 'm7', 'm6', 'm5']
+    assert feed.more
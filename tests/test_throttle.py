@@ -0,0 +1,205 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import pytest
+
+from mopidy_mixcloud.throttle import (
+    CircuitBreaker, SingleFlight, TokenBucket, backoff_delay,
+    parse_retry_after)
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_bucket_allows_burst_then_waits_for_refill():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, burst=2, timer=clock, sleep=clock.sleep)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.slept == []
+
+    bucket.acquire()
+    assert clock.slept == [pytest.approx(0.5)]
+
+
+def test_bucket_refills_over_time():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, burst=2, timer=clock, sleep=clock.sleep)
+    bucket.acquire()
+    bucket.acquire()
+
+    clock.now += 1
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.slept == []
+
+
+def test_zero_rate_does_not_limit():
+    clock = Clock()
+    bucket = TokenBucket(rate=0, timer=clock, sleep=clock.sleep)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.slept == []
+
+
+def test_throttled_waits_for_retry_after_and_halves_rate():
+    clock = Clock()
+    bucket = TokenBucket(rate=10, burst=10, timer=clock, sleep=clock.sleep)
+    bucket.throttled(retry_after=3)
+    assert bucket.rate == 5
+
+    bucket.acquire()
+    assert clock.slept == [pytest.approx(3)]
+    assert bucket.stats()['throttles'] == 1
+
+
+def test_rate_recovers_after_successes():
+    bucket = TokenBucket(rate=10)
+    bucket.throttled(retry_after=0)
+    for _ in range(4):
+        bucket.succeeded()
+    assert bucket.rate == pytest.approx(9)
+
+    bucket.succeeded()
+    bucket.succeeded()
+    assert bucket.rate == 10
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('-5') == 0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(flight.do('key', fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(
+        target=lambda: results.append(flight.do('key', fetch)))
+        for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    while flight.stats()['coalesced'] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert results == ['value'] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {'calls': 1, 'coalesced': 3, 'inflight': 0}
+
+
+def test_single_flight_propagates_errors_to_waiters():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise IOError('boom')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('key', fail)
+        except IOError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while flight.stats()['coalesced'] < 1:
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(errors) == 2
+    assert errors[0] is errors[1]
+    assert flight.do('key', lambda: 'again') == 'again'
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    assert backoff_delay(0, 0.5, random=lambda: 1) == 0.5
+    assert backoff_delay(3, 0.5, random=lambda: 1) == 4
+    assert backoff_delay(10, 0.5, random=lambda: 1) == 30
+    assert backoff_delay(3, 0.5, random=lambda: 0.5) == 2
+
+
+def test_breaker_opens_after_threshold():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=2, reset=30, timer=clock)
+    breaker.failed()
+    assert breaker.allow()
+
+    breaker.failed()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_breaker_half_opens_for_a_single_probe_then_closes():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=1, reset=30, timer=clock)
+    breaker.failed()
+
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.succeeded()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_opens_again():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=1, reset=30, timer=clock)
+    breaker.failed()
+    clock.now += 30
+    assert breaker.allow()
+
+    breaker.failed()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()['opens'] == 2
+
+    clock.now += 30
+    assert breaker.allow()